@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for YouTube Auto Backup
+
+Measures, in a fresh interpreter for each run:
+- import time of the entry point (main, which pulls in src.ui)
+- time from process start to the first paint of the main window
+- when the background yt-dlp prewarm starts and finishes; it must start
+  after the first paint so it does not compete with the window appearing
+
+Run from the repository root:
+
+    python benchmarks/startup.py --runs 5
+
+Use --json to get machine-readable output that can be tracked across releases.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Executed in a child interpreter so every run starts cold
+CHILD_SCRIPT = r'''
+import json
+import sys
+import time
+
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QObject, QEvent, QTimer
+import main
+imported = time.perf_counter()
+
+heavy_loaded = [name for name in ("yt_dlp", "requests") if name in sys.modules]
+
+prewarm = {}
+start_prewarm = main.start_prewarm
+
+
+def timed_prewarm():
+    """Record when the prewarm starts, and keep its thread to time its end"""
+    prewarm["started"] = time.perf_counter()
+    prewarm["thread"] = start_prewarm()
+
+
+main.start_prewarm = timed_prewarm
+
+
+class FirstPaint(QObject):
+    """Record the time of the first paint event, then wait for the prewarm and quit"""
+
+    painted = None
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and self.painted is None:
+            self.painted = time.perf_counter()
+            QTimer.singleShot(0, self.wait_for_prewarm)
+        return False
+
+    def wait_for_prewarm(self):
+        if "thread" not in prewarm:
+            QTimer.singleShot(10, self.wait_for_prewarm)
+            return
+        prewarm["thread"].join()
+        prewarm["finished"] = time.perf_counter()
+        QApplication.instance().quit()
+
+
+app = QApplication(sys.argv[:1])
+first_paint = FirstPaint()
+# An application-wide filter sees the window's paint before the window's own filters
+app.installEventFilter(first_paint)
+window = main.create_window()
+QTimer.singleShot(30000, app.quit)
+app.exec()
+
+
+def elapsed_ms(key):
+    return (prewarm[key] - start) * 1000 if key in prewarm else None
+
+
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_paint_ms": ((first_paint.painted or time.perf_counter()) - start) * 1000,
+    "prewarm_start_ms": elapsed_ms("started"),
+    "prewarm_done_ms": elapsed_ms("finished"),
+    "heavy_modules_at_import": heavy_loaded,
+}))
+'''
+
+
+def run_once():
+    """
+    Run a single cold startup measurement in a child process
+
+    Returns:
+        dict: Measurement for this run
+    """
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, ROOT],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    """Run the benchmark and print the results"""
+    parser = argparse.ArgumentParser(description="Measure application startup time")
+    parser.add_argument("--runs", type=int, default=5, help="number of cold starts to measure")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from src import __version__
+
+    runs = [run_once() for _ in range(args.runs)]
+    results = {
+        "version": __version__,
+        "runs": args.runs,
+        "import_ms": statistics.median(r["import_ms"] for r in runs),
+        "first_paint_ms": statistics.median(r["first_paint_ms"] for r in runs),
+        "prewarm_done_ms": statistics.median(r["prewarm_done_ms"] or 0 for r in runs),
+        "prewarm_before_paint": any(
+            r["prewarm_start_ms"] is not None and r["prewarm_start_ms"] < r["first_paint_ms"] for r in runs
+        ),
+        "heavy_modules_at_import": runs[0]["heavy_modules_at_import"],
+    }
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print(f"YouTube Auto Backup {results['version']} ({args.runs} runs, median)")
+        print(f"  import main:    {results['import_ms']:.1f} ms")
+        print(f"  first paint:    {results['first_paint_ms']:.1f} ms")
+        print(f"  prewarm done:   {results['prewarm_done_ms']:.1f} ms")
+        if results["prewarm_before_paint"]:
+            print("  WARNING: prewarm started before the first paint")
+        if results["heavy_modules_at_import"]:
+            print(f"  WARNING: loaded at import: {', '.join(results['heavy_modules_at_import'])}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,35 @@
 import sys
 from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QObject, QEvent, QTimer
 
 from src.ui import YouTubeDownloaderApp
+from src.downloader import start_prewarm
+
+
+class PrewarmOnFirstPaint(QObject):
+    """Event filter that starts loading yt-dlp once the window has painted"""
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            # Queue it behind the paint so it does not delay the window appearing
+            QTimer.singleShot(0, start_prewarm)
+        return False
+
+
+def create_window():
+    """Create and show the main window, prewarming yt-dlp after its first paint"""
+    window = YouTubeDownloaderApp()
+    window.prewarm_filter = PrewarmOnFirstPaint(window)
+    window.installEventFilter(window.prewarm_filter)
+    window.show()
+    return window
 
 
 def main():
     """Main entry point for the application"""
     app = QApplication(sys.argv)
-    window = YouTubeDownloaderApp()
-    window.show()
+    window = create_window()
     return app.exec()
 
 
@@ -0,0 +1,156 @@
+"""
+Per-folder index of downloaded videos and their integrity-check results
+"""
+
+import os
+import time
+import sqlite3
+
+INDEX_FILENAME = "archive_index.sqlite3"
+
+
+class ArchiveIndex:
+    """
+    SQLite index of the videos in one folder, keyed by filename.
+
+    Downloads record the source URL and the duration reported by YouTube;
+    scrubs record the size, modification time, checksum and container
+    duration they saw, so later scrubs can skip unchanged files.
+    """
+
+    def __init__(self, folder):
+        """
+        Args:
+            folder (str): Folder holding the videos
+        """
+        self.folder = os.path.abspath(folder)
+        self.path = os.path.join(self.folder, INDEX_FILENAME)
+        os.makedirs(self.folder, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS videos (
+                name TEXT PRIMARY KEY,
+                url TEXT,
+                expected_duration REAL,
+                size INTEGER,
+                mtime REAL,
+                checksum TEXT,
+                container_duration REAL,
+                status TEXT,
+                error TEXT,
+                checked_at REAL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def record_download(self, name, url, expected_duration=None):
+        """
+        Record a freshly downloaded video so the next scrub checks it.
+
+        Args:
+            name (str): Video filename
+            url (str): YouTube video URL
+            expected_duration (float, optional): Duration reported by YouTube, in seconds
+        """
+        self._conn.execute(
+            "INSERT INTO videos (name, url, expected_duration, status) VALUES (?, ?, ?, 'unchecked') "
+            "ON CONFLICT(name) DO UPDATE SET url = excluded.url, "
+            "expected_duration = COALESCE(excluded.expected_duration, expected_duration), "
+            "status = 'unchecked', checksum = NULL, checked_at = NULL",
+            (name, url, expected_duration)
+        )
+        self._conn.commit()
+
+    def get(self, name):
+        """
+        Look up a video.
+
+        Args:
+            name (str): Video filename
+
+        Returns:
+            dict: Index entry, or None if the video is not indexed
+        """
+        row = self._conn.execute("SELECT * FROM videos WHERE name = ?", (name,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def record_check(self, name, size, mtime, checksum, container_duration, status, error=None):
+        """
+        Store the result of an integrity check.
+
+        Args:
+            name (str): Video filename
+            size (int): File size in bytes
+            mtime (float): File modification time
+            checksum (str): SHA-256 of the file, or None
+            container_duration (float): Duration found in the container, or None
+            status (str): ``ok``, ``corrupt`` or ``short``
+            error (str, optional): What was wrong with the file
+        """
+        self._conn.execute(
+            "INSERT INTO videos (name, size, mtime, checksum, container_duration, status, error, checked_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET size = excluded.size, mtime = excluded.mtime, "
+            "checksum = excluded.checksum, container_duration = excluded.container_duration, "
+            "status = excluded.status, error = excluded.error, checked_at = excluded.checked_at",
+            (name, size, mtime, checksum, container_duration, status, error, time.time())
+        )
+        self._conn.commit()
+
+    def missing_durations(self):
+        """
+        List the videos with a known URL but no expected duration.
+
+        Returns:
+            dict: Filename to URL
+        """
+        rows = self._conn.execute(
+            "SELECT name, url FROM videos WHERE url IS NOT NULL AND expected_duration IS NULL"
+        )
+        return {row["name"]: row["url"] for row in rows}
+
+    def set_expected_duration(self, name, expected_duration):
+        """
+        Store the duration YouTube reports for an indexed video.
+
+        Args:
+            name (str): Video filename
+            expected_duration (float): Duration in seconds
+        """
+        self._conn.execute("UPDATE videos SET expected_duration = ? WHERE name = ?", (expected_duration, name))
+        self._conn.commit()
+
+    def names_by_url(self):
+        """
+        Map the source URL of every indexed video to its filename.
+
+        Returns:
+            dict: URL to filename
+        """
+        rows = self._conn.execute("SELECT url, name FROM videos WHERE url IS NOT NULL")
+        return {row["url"]: row["name"] for row in rows}
+
+    def rename(self, old_name, new_name):
+        """
+        Move a video's entry to a new filename.
+
+        Args:
+            old_name (str): Current filename
+            new_name (str): New filename
+        """
+        self._conn.execute("UPDATE videos SET name = ? WHERE name = ?", (new_name, old_name))
+        self._conn.commit()
+
+    def close(self):
+        """Close the index"""
+        self._conn.close()
@@ -0,0 +1,105 @@
+"""
+Command-line maintenance tools for YouTube Auto Backup archives
+"""
+
+import os
+import sys
+import argparse
+
+from src.sidecar_store import SidecarStore, STORE_FILENAME, sidecar_folders
+from src.scrub import scrub
+from src.work_queue import SQLiteWorkQueue
+
+
+def pack_sidecars(args):
+    """Move loose descriptions and thumbnails into per-folder sidecar stores"""
+    total = 0
+    for folder in sidecar_folders(args.download_path):
+        store = SidecarStore(folder)
+        try:
+            packed = store.pack_loose_files(remove=not args.keep)
+        finally:
+            store.close()
+        if packed:
+            print(f"Packed {packed} files in {folder}")
+        total += packed
+    print(f"Packed {total} files")
+    return 0
+
+
+def export_sidecars(args):
+    """Recreate loose descriptions and thumbnails from the sidecar stores"""
+    download_path = os.path.abspath(args.download_path)
+    total = 0
+    for folder in sidecar_folders(download_path):
+        if not os.path.exists(os.path.join(folder, STORE_FILENAME)):
+            continue
+        destination = folder
+        if args.destination:
+            destination = os.path.join(os.path.abspath(args.destination), os.path.relpath(folder, download_path))
+        store = SidecarStore(folder)
+        try:
+            written = store.export(destination)
+        finally:
+            store.close()
+        if written:
+            print(f"Exported {written} files to {destination}")
+        total += written
+    print(f"Exported {total} files")
+    return 0
+
+
+def scrub_videos(args):
+    """Check stored videos for truncation and short durations"""
+    work_queue = SQLiteWorkQueue(args.queue) if args.queue else None
+    max_rate = args.max_rate * 1024 * 1024 if args.max_rate else None
+    stats = scrub(args.download_path, max_workers=args.workers, max_rate=max_rate,
+                  full=args.full, work_queue=work_queue, api_key=args.api_key)
+    print(f"Checked {stats['ok'] + stats['corrupt'] + stats['short']} videos: {stats['ok']} ok, "
+          f"{stats['corrupt']} corrupt, {stats['short']} short, {stats['skipped']} unchanged since last scrub")
+    return 1 if stats['corrupt'] or stats['short'] else 0
+
+
+def build_parser():
+    """
+    Build the argument parser for all commands
+
+    Returns:
+        argparse.ArgumentParser: Parser with one subcommand per tool
+    """
+    parser = argparse.ArgumentParser(
+        prog="youtube-auto-backup-tools",
+        description="Maintenance tools for a YouTube Auto Backup download folder"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack = commands.add_parser("pack-sidecars", help="move loose .txt/.jpg sidecar files into sidecar stores")
+    pack.add_argument("download_path", help="download folder to migrate")
+    pack.add_argument("--keep", action="store_true", help="keep the loose files after packing them")
+    pack.set_defaults(func=pack_sidecars)
+
+    export = commands.add_parser("export-sidecars", help="recreate loose .txt/.jpg files from sidecar stores")
+    export.add_argument("download_path", help="download folder holding sidecar stores")
+    export.add_argument("--destination", help="write into this folder instead, keeping the folder layout")
+    export.set_defaults(func=export_sidecars)
+
+    scrub_parser = commands.add_parser("scrub", help="verify stored videos and set aside corrupt ones")
+    scrub_parser.add_argument("download_path", help="download folder to check")
+    scrub_parser.add_argument("--workers", type=int, default=4, help="number of files checked at once")
+    scrub_parser.add_argument("--max-rate", type=float, help="maximum total read rate in MB/s")
+    scrub_parser.add_argument("--full", action="store_true", help="also check files unchanged since the last scrub")
+    scrub_parser.add_argument("--queue", help="shared work queue to requeue bad videos in")
+    scrub_parser.add_argument("--api-key", help="YouTube Data API key to look up missing video durations")
+    scrub_parser.set_defaults(func=scrub_videos)
+
+    return parser
+
+
+def main(argv=None):
+    """Entry point for the command-line tools"""
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
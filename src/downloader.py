@@ -4,14 +4,141 @@ YouTube downloader module for handling video and channel downloads
 
 import os
 import time
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-import yt_dlp
-import requests
 from urllib.parse import urlparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from PySide6.QtCore import QObject, Signal
 
 from src.utils import sanitize_filename, format_filename, delete_https_subfolders, write_to_csv
+from src.work_queue import LeaseHeartbeat, default_worker_id
+from src.metadata import refresh_metadata
+from src.sidecar_store import write_sidecar
+from src.archive_index import ArchiveIndex
+from src.egress import is_route_error, transfer_hook
+
+# yt_dlp and requests are imported lazily inside the functions that need them,
+# so that importing this module (and therefore opening the UI) stays cheap.
+
+# Options for the metadata lookup that checks whether a single video already exists
+PROBE_OPTS = {
+    'format': 'bestvideo[ext=mp4][height=1080]+bestaudio[ext=m4a]/best[ext=mp4][height=1080]',
+    'quiet': True,
+    'skip_download': True
+}
+
+# Idle probe instances. Every download runs in a fresh thread, so instances
+# are pooled rather than kept per thread to be reused across downloads.
+_probe_pool = []
+_probe_pool_lock = threading.Lock()
+
+
+def new_probe_ydl():
+    """
+    Create a YoutubeDL instance for existence probes with the YouTube extractor loaded.
+
+    Returns:
+        yt_dlp.YoutubeDL: New instance
+    """
+    import yt_dlp
+    ydl = yt_dlp.YoutubeDL(dict(PROBE_OPTS))
+    ydl.get_info_extractor('Youtube')
+    return ydl
+
+
+@contextmanager
+def probe_ydl():
+    """
+    Borrow an idle YoutubeDL instance for an existence probe.
+
+    YoutubeDL is not thread-safe, so an instance is only used by one probe
+    at a time; it goes back to the pool when the probe is done. A new one
+    is created when every pooled instance is in use.
+
+    Yields:
+        yt_dlp.YoutubeDL: Instance to probe with
+    """
+    with _probe_pool_lock:
+        ydl = _probe_pool.pop() if _probe_pool else None
+    if ydl is None:
+        ydl = new_probe_ydl()
+    try:
+        yield ydl
+    finally:
+        with _probe_pool_lock:
+            _probe_pool.append(ydl)
+
+
+def prewarm_extractor():
+    """
+    Import yt-dlp and set up a probe instance ahead of the first download.
+
+    Meant to be run in a background thread once the window has painted, so
+    the first download does not pay the import and extractor setup cost.
+    The instance is put in the probe pool for that download to use.
+    """
+    try:
+        ydl = new_probe_ydl()
+    except Exception as e:
+        print(f"Error prewarming extractor: {e}")
+        return
+    with _probe_pool_lock:
+        _probe_pool.append(ydl)
+
+
+def start_prewarm():
+    """
+    Start prewarming the extractor in a daemon thread.
+
+    Returns:
+        threading.Thread: The started thread
+    """
+    thread = threading.Thread(target=prewarm_extractor, name="ydl-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def remove_staging_folders(download_path, url, active_workers=()):
+    """
+    Delete staging folders of a video left by workers that are gone.
+
+    A worker that still holds some lease may not have noticed yet that it
+    lost this video, so its folder is left for it to clean up.
+
+    Args:
+        download_path (str): Path to the download directory
+        url (str): YouTube video URL
+        active_workers (iterable): Identifiers of workers whose folders to keep
+    """
+    prefix = sanitize_filename(url)
+    keep = {f"{prefix}.{sanitize_filename(worker_id)}" for worker_id in active_workers}
+    if not os.path.isdir(download_path):
+        return
+    for name in os.listdir(download_path):
+        if (name == prefix or name.startswith(prefix + ".")) and name not in keep:
+            print(f"Deleting folder: {os.path.join(download_path, name)}")
+            shutil.rmtree(os.path.join(download_path, name), ignore_errors=True)
+
+
+def lease_hook(lease):
+    """
+    Build a yt-dlp progress hook that cancels the download once its lease is lost.
+
+    Args:
+        lease (LeaseHeartbeat): Heartbeat of the lease the video was claimed under
+
+    Returns:
+        callable: Progress hook
+    """
+    from yt_dlp.utils import DownloadCancelled
+
+    def hook(d):
+        if lease.lost:
+            raise DownloadCancelled("Lost the lease on this video")
+    return hook
 
 
 class DownloadWorker(QObject):
@@ -20,10 +147,52 @@ class DownloadWorker(QObject):
     progress = Signal(str, str)  # Signal to emit progress (current, total)
     finished = Signal(str)  # Signal to notify when download is done
 
-    def __init__(self):
+    # Lease duration for jobs claimed from a shared work queue
+    LEASE_SECONDS = 600
+
+    def __init__(self, work_queue=None, worker_id=None, pack_sidecars=False, egress_pool=None):
+        """
+        Args:
+            work_queue (WorkQueue, optional): Shared queue to take channel videos from
+            worker_id (str, optional): Identifier used for leases, defaults to hostname and pid
+            pack_sidecars (bool): Keep descriptions and thumbnails in the folder's
+                SidecarStore instead of as loose files
+            egress_pool (EgressPool, optional): Proxies and source addresses to spread downloads over
+        """
         super().__init__()
+        self.work_queue = work_queue
+        self.worker_id = worker_id or default_worker_id()
+        self.pack_sidecars = pack_sidecars
+        self.egress_pool = egress_pool
+
+    def save_sidecar(self, staged_path, download_path, name):
+        """
+        Move a downloaded description or thumbnail next to its video, or into the sidecar store.
+
+        The video is already in place when this runs, so a store that cannot be
+        written (e.g. locked by another host for too long) only leaves the file
+        loose; ``pack-sidecars`` can pack it later.
+        
+        Args:
+            staged_path (str): Path of the file in the staging folder
+            download_path (str): Path to download directory
+            name (str): Final filename
+        """
+        if self.pack_sidecars:
+            try:
+                with open(staged_path, 'rb') as f:
+                    write_sidecar(download_path, name, f.read(), pack=True)
+                os.remove(staged_path)
+                return
+            except sqlite3.Error as e:
+                print(f"Error writing {name} to the sidecar store, keeping it as a file: {e}")
+        try:
+            shutil.move(staged_path, os.path.join(download_path, name))
+        except OSError as e:
+            print(f"Error saving {name}: {e}")
 
-    def download_youtube_video(self, url, download_path='yt_downloads', title=None, upload_date=None):
+    def download_youtube_video(self, url, download_path='yt_downloads', title=None, upload_date=None,
+                               worker_id=None, lease=None):
         """
         Download a single YouTube video with its thumbnail and description
         
@@ -32,12 +201,25 @@ class DownloadWorker(QObject):
             download_path (str): Path to download directory
             title (str, optional): Video title (for channel downloads)
             upload_date (str, optional): Upload date (for channel downloads)
+            worker_id (str, optional): Lease holder when the video was claimed from a
+                shared work queue; gives the staging folder a per-worker name
+            lease (LeaseHeartbeat, optional): Heartbeat of that lease; once it is lost
+                the download is abandoned and nothing is moved into place
             
         Returns:
-            None
+            bool: True if the video is in place, False if all attempts failed
         """
+        import yt_dlp
+
         download_path = os.path.abspath(download_path)
-        delete_https_subfolders(download_path)
+        if worker_id:
+            # Holding the lease means no one else should be working on this video,
+            # so its staging folders of dead workers are stale. Folders of other
+            # videos may be in use by other hosts and are left alone.
+            active_workers = self.work_queue.active_workers() if self.work_queue else set()
+            remove_staging_folders(download_path, url, active_workers - {worker_id})
+        else:
+            delete_https_subfolders(download_path)
         ischannel = False
 
         if title and upload_date:
@@ -45,9 +227,11 @@ class DownloadWorker(QObject):
             upload_date = datetime.strptime(upload_date, "%Y-%m-%dT%H:%M:%SZ")
             mp4file = os.path.join(download_path, format_filename(upload_date, title, 'mp4'))
             if os.path.exists(mp4file):
-                return
+                return True
 
         download_folder = os.path.join(download_path, sanitize_filename(url))
+        if worker_id:
+            download_folder = f"{download_folder}.{sanitize_filename(worker_id)}"
         if not os.path.exists(download_folder):
             os.makedirs(download_folder, exist_ok=True)
         else:
@@ -64,6 +248,11 @@ class DownloadWorker(QObject):
                 
         e_num = 0
         while True:
+            egress = self.egress_pool.acquire() if self.egress_pool else None
+            transfer = {'bytes': 0, 'seconds': 0}
+            started = None
+            failed = False
+            route_failed = False
             try:
                 ydl_opts = {
                     'outtmpl': os.path.join(download_folder, 'files.%(ext)s'),
@@ -71,18 +260,31 @@ class DownloadWorker(QObject):
                     'writedescription': True,
                     'writethumbnail': True
                 }
+                if egress:
+                    ydl_opts.update(egress.ydl_options())
+                    ydl_opts.setdefault('progress_hooks', []).append(transfer_hook(transfer))
+                if lease is not None:
+                    ydl_opts.setdefault('progress_hooks', []).append(lease_hook(lease))
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    if not ischannel:
-                        info = ydl.extract_info(url, download=False)
-                        title = info.get('title')
-                        upload_date = datetime.strptime(info['upload_date'], "%Y%m%d")
-                        video_ext = info.get('ext')
-                        new_video_name = format_filename(upload_date, title, video_ext)
-                        if os.path.exists(os.path.join(download_path, new_video_name)):
-                            self.finished.emit(url)
-                            return
+                if not ischannel:
+                    if egress:
+                        # Pooled instances have no proxy or source address
+                        info = yt_dlp.YoutubeDL(dict(PROBE_OPTS, **egress.ydl_options())).extract_info(
+                            url, download=False
+                        )
+                    else:
+                        with probe_ydl() as ydl:
+                            info = ydl.extract_info(url, download=False)
+                    title = info.get('title')
+                    upload_date = datetime.strptime(info['upload_date'], "%Y%m%d")
+                    video_ext = info.get('ext')
+                    new_video_name = format_filename(upload_date, title, video_ext)
+                    if os.path.exists(os.path.join(download_path, new_video_name)):
+                        self.finished.emit(url)
+                        return True
 
+                started = time.time()
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                     info = ydl.extract_info(url, download=True)
                     title = info.get('title')
                     upload_date = datetime.strptime(info['upload_date'], "%Y%m%d")
@@ -93,25 +295,39 @@ class DownloadWorker(QObject):
                     new_video_name = format_filename(upload_date, title, video_ext)
                     print("new video name:", new_video_name)
                     os.makedirs(os.path.dirname(os.path.join(download_path, new_video_name)), exist_ok=True)
+                    if lease is not None and lease.lost:
+                        raise yt_dlp.utils.DownloadCancelled("Lost the lease on this video")
                     shutil.move(video_path, os.path.join(download_path, new_video_name))
                     print(f"Downloaded video: {new_video_name}")
+                    try:
+                        with ArchiveIndex(download_path) as index:
+                            index.record_download(new_video_name, url, info.get('duration'))
+                    except sqlite3.Error as e:
+                        # The video is in place; the next scrub still checks it for truncation
+                        print(f"Error recording {new_video_name} in the archive index: {e}")
                     
                     # Rename downloaded thumbnail
                     thumbnail_path = os.path.join(download_folder, f"files.webp")
                     if os.path.exists(thumbnail_path):
                         new_thumbnail_name = format_filename(upload_date, title, "jpg")
-                        shutil.move(thumbnail_path, os.path.join(download_path, new_thumbnail_name))
+                        self.save_sidecar(thumbnail_path, download_path, new_thumbnail_name)
                         print(f"Downloaded thumbnail: {new_thumbnail_name}")
 
                     # Rename description info to .txt
                     txt_path = os.path.join(download_folder, f"files.description")
                     if os.path.exists(txt_path):
                         new_description_name = format_filename(upload_date, title, "txt")
-                        shutil.move(txt_path, os.path.join(download_path, new_description_name))
+                        self.save_sidecar(txt_path, download_path, new_description_name)
                         print(f"Saved description as: {new_description_name}")
                     break
             except Exception as e:
                 print(str(e))
+                failed = True
+                route_failed = is_route_error(e)
+                if lease is not None and lease.lost:
+                    # Another worker owns the video now
+                    shutil.rmtree(download_folder, ignore_errors=True)
+                    return False
                 if e_num == 0:
                     ydl_opts = {
                         'outtmpl': os.path.join(download_folder, 'files.%(ext)s'),
@@ -129,14 +345,22 @@ class DownloadWorker(QObject):
                 elif e_num == 5:
                     if not ischannel:
                         self.finished.emit(url) 
-                    return
+                    return False
                 e_num += 1
+            finally:
+                if egress and ((started is None and not failed) or (failed and not route_failed)):
+                    # The video already existed, or failed for reasons no egress can fix
+                    self.egress_pool.cancel(egress)
+                elif egress:
+                    # Prefer the transfer time reported by yt-dlp over the whole attempt
+                    elapsed = transfer['seconds'] or (time.time() - started if started else 0)
+                    self.egress_pool.release(egress, transfer['bytes'], elapsed, failed)
         
         if os.path.exists(download_folder):
-            import shutil
             shutil.rmtree(download_folder)
         if not ischannel:
             self.finished.emit(url)        
+        return True
 
     def download_channel_videos(self, channel_url, api_key, download_path='yt_downloads'):
         """
@@ -165,6 +389,11 @@ class DownloadWorker(QObject):
             self.finished.emit(channel_url)
             return
 
+        if self.work_queue is not None:
+            self.download_channel_from_queue(channel_url, channel_name, videos, download_path)
+            self.finished.emit(channel_url)
+            return
+
         for i, video in enumerate(videos):
             self.progress.emit(channel_url, f"{i+1}/{len(videos)}")
             self.download_youtube_video(video['url'], download_path, video['title'], video['upload_date'])
@@ -175,6 +404,100 @@ class DownloadWorker(QObject):
 
         self.finished.emit(channel_url)
 
+    def refresh_channel_metadata(self, channel_url, api_key, download_path='yt_downloads'):
+        """
+        Refresh descriptions and thumbnails of a channel without downloading any media
+        
+        Args:
+            channel_url (str): YouTube channel URL
+            api_key (str): YouTube Data API key
+            download_path (str): Path to download directory
+            
+        Returns:
+            None
+        """
+        uploads_playlist_id, channel_name = self.get_channel_uploads_playlist_id(channel_url, api_key)
+        if not uploads_playlist_id:
+            print("Failed to retrieve uploads playlist ID.")
+            self.finished.emit(channel_url)
+            return
+
+        channel_folder = os.path.join(download_path, sanitize_filename(channel_name))
+        videos = self.get_all_videos_from_playlist(uploads_playlist_id, api_key)
+        print(f"Total videos found: {len(videos)}\n")
+
+        stats = refresh_metadata(
+            videos, api_key, channel_folder, pack=self.pack_sidecars,
+            progress=lambda done, total: self.progress.emit(channel_url, f"{done}/{total}")
+        )
+        print(f"Updated {stats['descriptions']} descriptions and {stats['thumbnails']} thumbnails, "
+              f"renamed {stats['renamed']} videos, {stats['unchanged']} unchanged, "
+              f"{stats['missing']} not backed up, {stats['errors']} errors")
+        self.finished.emit(channel_url)
+
+    def download_channel_from_queue(self, channel_url, channel_name, videos, download_path):
+        """
+        Download a channel's videos through the shared work queue.
+
+        All videos are enqueued (hosts enqueueing the same channel do not
+        create duplicates). Videos without a local file are made available
+        again even if an earlier run finished or gave up on them, so that a
+        later backup retries them like a single-machine download would. Jobs
+        are then claimed one at a time under a lease
+        that is renewed while the download runs. When nothing is claimable but
+        other workers still hold leases, this waits so that leases of dead
+        workers can be taken over once they expire.
+
+        Args:
+            channel_url (str): YouTube channel URL
+            channel_name (str): Name of the channel
+            videos (list): List of video information dictionaries
+            download_path (str): Path to the channel folder
+        """
+        queue = self.work_queue
+        queue.enqueue([dict(video, channel_name=channel_name) for video in videos])
+        missing = [
+            video['url'] for video in videos
+            if not os.path.exists(os.path.join(download_path, format_filename(
+                datetime.strptime(video['upload_date'], "%Y-%m-%dT%H:%M:%SZ"), video['title'], 'mp4'
+            )))
+        ]
+        requeued = queue.requeue(missing)
+        if requeued:
+            print(f"Requeued {requeued} finished or failed videos that are not in {download_path}")
+        csv_file_path = os.path.abspath("video_data.csv")
+
+        while True:
+            job = queue.claim(self.worker_id, self.LEASE_SECONDS, channel_name=channel_name)
+            if job is None:
+                if not queue.counts(channel_name).get('leased'):
+                    break
+                time.sleep(min(self.LEASE_SECONDS / 3, 30))
+                continue
+
+            with LeaseHeartbeat(queue, job['url'], self.worker_id, self.LEASE_SECONDS) as lease:
+                try:
+                    ok = self.download_youtube_video(
+                        job['url'], download_path, job['title'], job['upload_date'],
+                        worker_id=self.worker_id, lease=lease
+                    )
+                    error = "all download attempts failed"
+                except Exception as e:
+                    ok = False
+                    error = str(e)
+
+            if lease.lost:
+                print(f"Abandoned {job['url']}, another worker took it over")
+            elif ok:
+                queue.complete(job['url'], self.worker_id)
+                write_to_csv(csv_file_path, channel_name, job['title'], job['url'])
+            else:
+                queue.fail(job['url'], self.worker_id, error)
+
+            counts = queue.counts(channel_name)
+            finished = counts.get('done', 0) + counts.get('failed', 0)
+            self.progress.emit(channel_url, f"{finished}/{sum(counts.values())}")
+
     def download_video(self, video, download_path, download_function):
         """
         Wrapper function to download a video.
@@ -227,6 +550,8 @@ class DownloadWorker(QObject):
         Returns:
             tuple: (uploads_playlist_id, channel_name) or (None, None)
         """
+        import requests
+
         channel_id = ''
         try:
             parsed_url = urlparse(channel_url)
@@ -268,6 +593,8 @@ class DownloadWorker(QObject):
         Returns:
             list: List of video information dictionaries
         """
+        import requests
+
         base_url = "https://www.googleapis.com/youtube/v3/playlistItems"
         max_results_per_request = 50
 
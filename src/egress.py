@@ -0,0 +1,312 @@
+"""
+Egress pool: spread downloads over several proxies and source addresses
+"""
+
+import json
+import time
+import threading
+
+from src.utils import write_if_changed
+
+# Weight of the newest sample in an egress's throughput average
+THROUGHPUT_SMOOTHING = 0.3
+
+# Error messages that point at the route rather than at the video: rate limits,
+# bot checks and connection or proxy problems
+ROUTE_ERROR_MARKERS = (
+    'http error 429', 'too many requests', 'http error 403', 'forbidden',
+    'not a bot', 'unable to connect to proxy', 'proxyerror', 'proxy error',
+    'connection refused', 'connection reset', 'timed out', 'failed to establish a new connection',
+)
+
+
+class Egress:
+    """One route out: an HTTP/SOCKS proxy, a local source address, or both"""
+
+    def __init__(self, name, proxy=None, source_address=None):
+        """
+        Args:
+            name (str): Name shown in stats
+            proxy (str, optional): Proxy URL, e.g. ``socks5://127.0.0.1:1080``
+            source_address (str, optional): Local IP address to bind to
+        """
+        self.name = name
+        self.proxy = proxy
+        self.source_address = source_address
+        self.active = 0
+        self.downloads = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.total_bytes = 0
+        self.total_seconds = 0.0
+        self.throughput = None
+        self.cooldowns = 0
+        self.cooldown_until = 0.0
+
+    def ydl_options(self):
+        """
+        Build the yt-dlp options routing a download through this egress.
+
+        Returns:
+            dict: Options to merge into ``ydl_opts``
+        """
+        options = {}
+        if self.proxy:
+            options['proxy'] = self.proxy
+        if self.source_address:
+            options['source_address'] = self.source_address
+        return options
+
+
+class EgressPool:
+    """
+    Hands out egresses to download workers and cools down slow ones.
+
+    Workers ``acquire`` an egress before a download and ``release`` it with
+    the number of bytes transferred. An egress whose average throughput
+    falls below ``min_throughput``, or whose last ``max_failures`` downloads
+    all failed (e.g. rate limited or asked for a bot check), is not handed
+    out again until its cooldown ends, unless every egress is cooling down.
+    """
+
+    STRATEGIES = ('round_robin', 'least_loaded')
+
+    def __init__(self, egresses, strategy='round_robin', min_throughput=None, cooldown_seconds=300,
+                 max_failures=3, stats_path=None, clock=time.monotonic):
+        """
+        Args:
+            egresses (list): Egress instances
+            strategy (str): ``round_robin`` or ``least_loaded``
+            min_throughput (float, optional): Bytes per second below which an egress is cooled down
+            cooldown_seconds (float): How long a slow or failing egress is left out
+            max_failures (int, optional): Failed downloads in a row after which an egress is cooled down
+            stats_path (str, optional): JSON file to write per-egress stats to after each download
+            clock (callable): Time source, replaceable in tests
+        """
+        if not egresses:
+            raise ValueError("An egress pool needs at least one egress")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown egress strategy: {strategy}")
+        self.egresses = list(egresses)
+        self.strategy = strategy
+        self.min_throughput = min_throughput
+        self.cooldown_seconds = cooldown_seconds
+        self.max_failures = max_failures
+        self.stats_path = stats_path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._next = 0
+
+    @classmethod
+    def from_config(cls, path):
+        """
+        Build a pool from a JSON config file.
+
+        Example config::
+
+            {
+                "strategy": "least_loaded",
+                "min_throughput": 500000,
+                "cooldown_seconds": 300,
+                "max_failures": 3,
+                "stats_path": "egress_stats.json",
+                "egresses": [
+                    {"name": "direct"},
+                    {"name": "nic2", "source_address": "192.168.1.20"},
+                    {"name": "proxy1", "proxy": "socks5://10.0.0.5:1080"}
+                ]
+            }
+
+        Args:
+            path (str): Path to the config file
+
+        Returns:
+            EgressPool: Configured pool
+        """
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        egresses = [
+            Egress(entry.get('name') or entry.get('proxy') or entry.get('source_address') or f"egress{i}",
+                   proxy=entry.get('proxy'), source_address=entry.get('source_address'))
+            for i, entry in enumerate(config['egresses'])
+        ]
+        return cls(
+            egresses,
+            strategy=config.get('strategy', 'round_robin'),
+            min_throughput=config.get('min_throughput'),
+            cooldown_seconds=config.get('cooldown_seconds', 300),
+            max_failures=config.get('max_failures', 3),
+            stats_path=config.get('stats_path'),
+        )
+
+    def acquire(self):
+        """
+        Pick an egress for the next download.
+
+        Returns:
+            Egress: The egress to use; pass it to ``release`` afterwards
+        """
+        with self._lock:
+            now = self.clock()
+            available = [egress for egress in self.egresses if egress.cooldown_until <= now]
+            if not available:
+                # Everything is cooling down: use whichever comes back first
+                available = [min(self.egresses, key=lambda egress: egress.cooldown_until)]
+
+            if self.strategy == 'least_loaded':
+                egress = min(available, key=lambda e: (e.active, -(e.throughput or float('inf'))))
+            else:
+                for _ in range(len(self.egresses)):
+                    candidate = self.egresses[self._next % len(self.egresses)]
+                    self._next += 1
+                    if candidate in available:
+                        egress = candidate
+                        break
+                else:
+                    egress = available[0]
+
+            egress.active += 1
+            return egress
+
+    def release(self, egress, downloaded_bytes, elapsed, failed=False):
+        """
+        Return an egress after a download and update its throughput.
+
+        Args:
+            egress (Egress): Egress returned by ``acquire``
+            downloaded_bytes (int): Bytes transferred through it
+            elapsed (float): Seconds spent transferring those bytes
+            failed (bool): Whether the download failed
+        """
+        with self._lock:
+            egress.active -= 1
+            if failed:
+                egress.failures += 1
+                egress.consecutive_failures += 1
+                if self.max_failures and egress.consecutive_failures >= self.max_failures:
+                    print(f"Egress {egress.name} failed {egress.consecutive_failures} downloads in a row, cooling down")
+                    self._cool_down(egress)
+            else:
+                egress.downloads += 1
+                egress.consecutive_failures = 0
+
+            if downloaded_bytes and elapsed > 0:
+                egress.total_bytes += downloaded_bytes
+                egress.total_seconds += elapsed
+                sample = downloaded_bytes / elapsed
+                if egress.throughput is None:
+                    egress.throughput = sample
+                else:
+                    egress.throughput += THROUGHPUT_SMOOTHING * (sample - egress.throughput)
+
+                if self.min_throughput and egress.throughput < self.min_throughput:
+                    print(f"Egress {egress.name} is slow ({egress.throughput / 1024:.0f} KB/s), cooling down")
+                    self._cool_down(egress)
+
+            stats = self._stats()
+        self._write_stats(stats)
+
+    def cancel(self, egress):
+        """
+        Return an egress without counting a download or a failure, e.g. because
+        the video already exists or cannot be downloaded through any route.
+
+        Args:
+            egress (Egress): Egress returned by ``acquire``
+        """
+        with self._lock:
+            egress.active -= 1
+
+    def _cool_down(self, egress):
+        egress.cooldown_until = self.clock() + self.cooldown_seconds
+        egress.cooldowns += 1
+        # Start afresh when it comes back
+        egress.throughput = None
+        egress.consecutive_failures = 0
+
+    def _write_stats(self, stats):
+        if self.stats_path:
+            try:
+                write_if_changed(self.stats_path, json.dumps(stats, indent=2).encode('utf-8'))
+            except OSError as e:
+                print(f"Error writing egress stats: {e}")
+
+    def _stats(self):
+        now = self.clock()
+        return [
+            {
+                'name': egress.name,
+                'proxy': egress.proxy,
+                'source_address': egress.source_address,
+                'active': egress.active,
+                'downloads': egress.downloads,
+                'failures': egress.failures,
+                'bytes': egress.total_bytes,
+                'average_throughput': egress.total_bytes / egress.total_seconds if egress.total_seconds else None,
+                'recent_throughput': egress.throughput,
+                'cooldowns': egress.cooldowns,
+                'cooling_down': egress.cooldown_until > now,
+            }
+            for egress in self.egresses
+        ]
+
+    def stats(self):
+        """
+        Report per-egress usage and throughput.
+
+        Returns:
+            list: One dict per egress, throughput in bytes per second
+        """
+        with self._lock:
+            return self._stats()
+
+
+def is_route_error(error):
+    """
+    Tell whether a download error is caused by the egress rather than the video.
+
+    Errors such as "Private video" or a missing format would fail through
+    every egress, so they must not cool one down.
+
+    Args:
+        error (Exception): Error raised by the download
+
+    Returns:
+        bool: True for rate limits, bot checks and connection or proxy errors
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (ConnectionError, TimeoutError)):
+            return True
+        message = str(error).lower()
+        if any(marker in message for marker in ROUTE_ERROR_MARKERS):
+            return True
+        # yt-dlp wraps the original error in DownloadError.exc_info
+        exc_info = getattr(error, 'exc_info', None)
+        if exc_info and exc_info[1] is not None and exc_info[1] is not error:
+            error = exc_info[1]
+        else:
+            error = error.__cause__ or error.__context__
+    return False
+
+
+def transfer_hook(transfer):
+    """
+    Build a yt-dlp progress hook that adds finished downloads to ``transfer``.
+
+    Only the transfer itself is timed: ``transfer['seconds']`` sums the
+    ``elapsed`` yt-dlp reports for each finished file, so extraction,
+    merging and moving files do not lower the measured throughput.
+
+    Args:
+        transfer (dict): Counters ``bytes`` and ``seconds`` updated by the hook
+
+    Returns:
+        callable: Progress hook
+    """
+    def hook(d):
+        if d.get('status') == 'finished':
+            transfer['bytes'] += d.get('total_bytes') or d.get('downloaded_bytes') or 0
+            transfer['seconds'] = transfer.get('seconds', 0) + (d.get('elapsed') or 0)
+    return hook
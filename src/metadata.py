@@ -0,0 +1,325 @@
+"""
+Metadata-only backup: refresh descriptions and thumbnails through the YouTube Data API
+"""
+
+import os
+import re
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.utils import format_filename
+from src.sidecar_store import SidecarStore, STORE_FILENAME, write_sidecar
+from src.archive_index import ArchiveIndex, INDEX_FILENAME
+
+VIDEOS_URL = "https://www.googleapis.com/youtube/v3/videos"
+
+# The Data API accepts at most 50 ids per videos.list call
+MAX_IDS_PER_REQUEST = 50
+
+# ISO 8601 durations as returned in contentDetails.duration, e.g. PT1H2M3S
+DURATION_PATTERN = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?)?$")
+
+# Thumbnail sizes from best to worst
+THUMBNAIL_PREFERENCE = ('maxres', 'standard', 'high', 'medium', 'default')
+
+
+def create_session(pool_size=16):
+    """
+    Create a requests session whose connection pool fits the worker count.
+
+    Args:
+        pool_size (int): Number of connections kept per host
+
+    Returns:
+        requests.Session: Session with pooled connections
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def video_id_from_url(url):
+    """
+    Extract the video id from a YouTube watch URL.
+
+    Args:
+        url (str): YouTube video URL
+
+    Returns:
+        str: Video id, or None if the URL has none
+    """
+    parsed_url = urlparse(url)
+    if parsed_url.netloc.endswith("youtu.be"):
+        return parsed_url.path.strip("/") or None
+    return parse_qs(parsed_url.query).get("v", [None])[0]
+
+
+def best_thumbnail_url(thumbnails):
+    """
+    Pick the largest available thumbnail.
+
+    Args:
+        thumbnails (dict): The ``snippet.thumbnails`` object of a video
+
+    Returns:
+        str: Thumbnail URL, or None if there is none
+    """
+    for size in THUMBNAIL_PREFERENCE:
+        if size in thumbnails:
+            return thumbnails[size]["url"]
+    return None
+
+
+def fetch_video_items(video_ids, api_key, session, part, max_workers=8):
+    """
+    Fetch videos.list items of many videos in batches.
+
+    Args:
+        video_ids (list): Video ids
+        api_key (str): YouTube Data API key
+        session (requests.Session): Session to send the requests with
+        part (str): Resource parts to fetch, e.g. ``snippet``
+        max_workers (int): Number of batches fetched concurrently
+
+    Returns:
+        list: Video resources; videos in failed batches are missing
+    """
+    def fetch_batch(batch):
+        params = {
+            "part": part,
+            "id": ",".join(batch),
+            "maxResults": MAX_IDS_PER_REQUEST,
+            "key": api_key,
+        }
+        response = session.get(VIDEOS_URL, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    batches = [video_ids[i:i + MAX_IDS_PER_REQUEST] for i in range(0, len(video_ids), MAX_IDS_PER_REQUEST)]
+    items = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(fetch_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            try:
+                data = future.result()
+            except Exception as e:
+                print(f"Error fetching video metadata: {e}")
+                continue
+            items.extend(data.get("items", []))
+    return items
+
+
+def fetch_video_metadata(video_ids, api_key, session, max_workers=8):
+    """
+    Fetch title, description and thumbnail URL of many videos in batches.
+
+    Args:
+        video_ids (list): Video ids
+        api_key (str): YouTube Data API key
+        session (requests.Session): Session to send the requests with
+        max_workers (int): Number of batches fetched concurrently
+
+    Returns:
+        dict: Mapping of video id to a dict with ``title``, ``description`` and ``thumbnail_url``
+    """
+    metadata = {}
+    for item in fetch_video_items(video_ids, api_key, session, "snippet", max_workers):
+        snippet = item["snippet"]
+        metadata[item["id"]] = {
+            "title": snippet["title"],
+            "description": snippet.get("description", ""),
+            "thumbnail_url": best_thumbnail_url(snippet.get("thumbnails", {})),
+        }
+    return metadata
+
+
+def parse_duration(duration):
+    """
+    Convert an ISO 8601 duration from the Data API to seconds.
+
+    Args:
+        duration (str): Duration such as ``PT1H2M3S``
+
+    Returns:
+        float: Duration in seconds, or None if it cannot be parsed
+    """
+    match = DURATION_PATTERN.match(duration or "")
+    if not match:
+        return None
+    days, hours, minutes, seconds = (float(value) if value else 0.0 for value in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def fetch_video_durations(video_ids, api_key, session, max_workers=8):
+    """
+    Fetch the durations of many videos in batches.
+
+    Args:
+        video_ids (list): Video ids
+        api_key (str): YouTube Data API key
+        session (requests.Session): Session to send the requests with
+        max_workers (int): Number of batches fetched concurrently
+
+    Returns:
+        dict: Mapping of video id to duration in seconds
+    """
+    durations = {}
+    for item in fetch_video_items(video_ids, api_key, session, "contentDetails", max_workers):
+        duration = parse_duration(item.get("contentDetails", {}).get("duration"))
+        if duration:
+            durations[item["id"]] = duration
+    return durations
+
+
+def locate_videos(download_path, upload_dates, metadata):
+    """
+    Find the existing video file of each video, even if its title has changed since.
+
+    A video is matched by the URL recorded in the folder's archive index,
+    then by its current filename. Matching by upload date alone is not
+    safe: a deleted video's file would be taken for a new upload from the
+    same day, which would then never be downloaded.
+
+    Args:
+        download_path (str): Channel folder
+        upload_dates (dict): Mapping of video id to upload date
+        metadata (dict): Mapping of video id to metadata from ``fetch_video_metadata``
+
+    Returns:
+        dict: Mapping of video id to the filename of its ``.mp4`` without the extension
+    """
+    if not os.path.isdir(download_path):
+        return {}
+    stems = {name[:-len(".mp4")] for name in os.listdir(download_path) if name.endswith(".mp4")}
+    located = {}
+
+    if os.path.exists(os.path.join(download_path, INDEX_FILENAME)):
+        with ArchiveIndex(download_path) as index:
+            for url, name in index.names_by_url().items():
+                video_id = video_id_from_url(url)
+                if video_id in metadata and name.endswith(".mp4") and name[:-len(".mp4")] in stems:
+                    located[video_id] = name[:-len(".mp4")]
+
+    for video_id, info in metadata.items():
+        stem = format_filename(upload_dates[video_id], info["title"], "mp4")[:-len(".mp4")]
+        if video_id not in located and stem in stems and stem not in located.values():
+            located[video_id] = stem
+
+    return located
+
+
+def rename_video(download_path, old_stem, new_stem):
+    """
+    Rename a video together with its sidecar files and index entry.
+
+    Args:
+        download_path (str): Channel folder
+        old_stem (str): Current filename without extension
+        new_stem (str): New filename without extension
+    """
+    for ext in ("mp4", "txt", "jpg"):
+        old_path = os.path.join(download_path, f"{old_stem}.{ext}")
+        if os.path.exists(old_path):
+            os.replace(old_path, os.path.join(download_path, f"{new_stem}.{ext}"))
+
+    if os.path.exists(os.path.join(download_path, STORE_FILENAME)):
+        store = SidecarStore.for_folder(download_path)
+        for ext in ("txt", "jpg"):
+            store.rename(f"{old_stem}.{ext}", f"{new_stem}.{ext}")
+
+    if os.path.exists(os.path.join(download_path, INDEX_FILENAME)):
+        with ArchiveIndex(download_path) as index:
+            index.rename(f"{old_stem}.mp4", f"{new_stem}.mp4")
+    print(f"Renamed {old_stem} to {new_stem}")
+
+
+def refresh_metadata(videos, api_key, download_path, session=None, max_workers=16, progress=None, pack=False):
+    """
+    Refresh the title, description and thumbnail of every backed-up video.
+
+    Videos without a local ``.mp4`` are skipped. When a title has changed,
+    the video and its existing sidecar files are renamed to the new title
+    first. Files are named like the ones written by a full download, from
+    the upload date of the playlist entry and the current title, and only
+    rewritten when their content changed.
+
+    Args:
+        videos (list): Video information dictionaries with ``url`` and ``upload_date``
+        api_key (str): YouTube Data API key
+        download_path (str): Channel folder to write into
+        session (requests.Session, optional): Session to reuse, a pooled one is created if omitted
+        max_workers (int): Number of thumbnails fetched concurrently
+        progress (callable, optional): Called with (done, total) after each video
+        pack (bool): Write into the folder's SidecarStore instead of loose files
+
+    Returns:
+        dict: Counts of ``descriptions`` and ``thumbnails`` written, ``renamed`` videos,
+        ``unchanged`` files, ``missing`` videos (not backed up) and ``errors``
+    """
+    if session is None:
+        session = create_session(max_workers)
+    os.makedirs(download_path, exist_ok=True)
+
+    upload_dates = {}
+    for video in videos:
+        video_id = video_id_from_url(video["url"])
+        if video_id:
+            upload_dates[video_id] = datetime.strptime(video["upload_date"], "%Y-%m-%dT%H:%M:%SZ")
+
+    metadata = fetch_video_metadata(list(upload_dates), api_key, session)
+    located = locate_videos(download_path, upload_dates, metadata)
+    stats = {
+        "descriptions": 0, "thumbnails": 0, "renamed": 0, "unchanged": 0,
+        "missing": len(metadata) - len(located), "errors": len(upload_dates) - len(metadata),
+    }
+
+    for video_id, old_stem in located.items():
+        new_stem = format_filename(upload_dates[video_id], metadata[video_id]["title"], "mp4")[:-len(".mp4")]
+        if old_stem == new_stem:
+            continue
+        if os.path.exists(os.path.join(download_path, f"{new_stem}.mp4")):
+            print(f"Not renaming {old_stem}: {new_stem}.mp4 already exists")
+            continue
+        try:
+            rename_video(download_path, old_stem, new_stem)
+            stats["renamed"] += 1
+        except OSError as e:
+            print(f"Error renaming {old_stem}: {e}")
+            stats["errors"] += 1
+
+    def refresh_video(video_id):
+        info = metadata[video_id]
+        upload_date = upload_dates[video_id]
+        written = []
+
+        description_name = format_filename(upload_date, info["title"], "txt")
+        written.append(("descriptions", write_sidecar(
+            download_path, description_name, info["description"].encode("utf-8"), pack
+        )))
+
+        if info["thumbnail_url"]:
+            response = session.get(info["thumbnail_url"])
+            response.raise_for_status()
+            thumbnail_name = format_filename(upload_date, info["title"], "jpg")
+            written.append(("thumbnails", write_sidecar(download_path, thumbnail_name, response.content, pack)))
+        return written
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(refresh_video, video_id) for video_id in located]
+        for i, future in enumerate(as_completed(futures)):
+            try:
+                for kind, changed in future.result():
+                    stats[kind if changed else "unchanged"] += 1
+            except Exception as e:
+                print(f"Error refreshing metadata: {e}")
+                stats["errors"] += 1
+            if progress:
+                progress(i + 1, len(futures))
+
+    return stats
@@ -0,0 +1,347 @@
+"""
+Integrity scrub: find truncated or short videos in a download folder
+"""
+
+import os
+import time
+import struct
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.archive_index import ArchiveIndex
+from src.metadata import create_session, fetch_video_durations, video_id_from_url
+
+CHUNK_SIZE = 1024 * 1024
+
+# A video may be this much shorter than YouTube reports before it counts as short
+DURATION_TOLERANCE_SECONDS = 2.0
+DURATION_TOLERANCE_RATIO = 0.01
+
+# Suffix given to bad files so the next download fetches the video again
+CORRUPT_SUFFIX = ".corrupt"
+
+
+class RateLimiter:
+    """Token bucket shared by scrub workers to cap the total read rate"""
+
+    def __init__(self, bytes_per_second):
+        """
+        Args:
+            bytes_per_second (float): Maximum read rate, or None for no limit
+        """
+        self.bytes_per_second = bytes_per_second
+        self._lock = threading.Lock()
+        self._next_time = time.monotonic()
+
+    def consume(self, size):
+        """
+        Wait until ``size`` more bytes may be read.
+
+        Args:
+            size (int): Number of bytes about to be read
+        """
+        if not self.bytes_per_second:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next_time, now)
+            self._next_time = start + size / self.bytes_per_second
+            delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def mp4_duration(file_path):
+    """
+    Check the top-level box structure of an MP4 file and read its duration.
+
+    Args:
+        file_path (str): Path to the MP4 file
+
+    Returns:
+        float: Duration in seconds from the movie header
+
+    Raises:
+        ValueError: If the file is truncated or has no readable movie header
+    """
+    file_size = os.path.getsize(file_path)
+    boxes = {}
+    with open(file_path, 'rb') as f:
+        offset = 0
+        while offset < file_size:
+            f.seek(offset)
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"truncated box header at byte {offset}")
+            size, box_type = struct.unpack(">I4s", header)
+            header_size = 8
+            if size == 1:
+                size = struct.unpack(">Q", f.read(8))[0]
+                header_size = 16
+            elif size == 0:
+                size = file_size - offset
+            if size < header_size:
+                raise ValueError(f"invalid box size at byte {offset}")
+            if offset + size > file_size:
+                raise ValueError(
+                    f"'{box_type.decode('latin-1')}' box ends at byte {offset + size}, file has {file_size}"
+                )
+            boxes[box_type] = (offset + header_size, size - header_size)
+            offset += size
+
+        if b"mdat" not in boxes:
+            raise ValueError("no media data")
+        if b"moov" not in boxes:
+            raise ValueError("no movie header")
+
+        moov_start, moov_size = boxes[b"moov"]
+        f.seek(moov_start)
+        moov = f.read(moov_size)
+
+    position = 0
+    while position + 8 <= len(moov):
+        size, box_type = struct.unpack(">I4s", moov[position:position + 8])
+        if size < 8:
+            break
+        if box_type == b"mvhd":
+            version = moov[position + 8]
+            if version == 1:
+                timescale, duration = struct.unpack(">IQ", moov[position + 28:position + 40])
+            else:
+                timescale, duration = struct.unpack(">II", moov[position + 20:position + 28])
+            if not timescale:
+                raise ValueError("movie header has no timescale")
+            return duration / timescale
+        position += size
+    raise ValueError("no movie header")
+
+
+def file_checksum(file_path, rate_limiter=None):
+    """
+    Compute the SHA-256 of a file while streaming it in chunks.
+
+    Args:
+        file_path (str): Path to the file
+        rate_limiter (RateLimiter, optional): Limiter to throttle reads with
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while True:
+            if rate_limiter:
+                rate_limiter.consume(CHUNK_SIZE)
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def duration_error(container_duration, expected_duration):
+    """
+    Compare the duration found in a file with the one YouTube reports.
+
+    Args:
+        container_duration (float): Duration from the movie header, in seconds
+        expected_duration (float): Duration reported by YouTube, or None if unknown
+
+    Returns:
+        str: Why the video is too short, or None if it is long enough or the duration is unknown
+    """
+    if not expected_duration or container_duration is None:
+        return None
+    allowed = max(DURATION_TOLERANCE_SECONDS, expected_duration * DURATION_TOLERANCE_RATIO)
+    if container_duration < expected_duration - allowed:
+        return f"duration {container_duration:.1f}s, expected {expected_duration:.1f}s"
+    return None
+
+
+def check_video(file_path, expected_duration=None, rate_limiter=None):
+    """
+    Check one video file.
+
+    Args:
+        file_path (str): Path to the video
+        expected_duration (float, optional): Duration reported by YouTube, in seconds
+        rate_limiter (RateLimiter, optional): Limiter to throttle reads with
+
+    Returns:
+        dict: ``checksum``, ``container_duration``, ``status`` (``ok``, ``corrupt``
+        or ``short``) and ``error``
+    """
+    result = {"checksum": None, "container_duration": None, "status": "ok", "error": None}
+    try:
+        result["container_duration"] = mp4_duration(file_path)
+    except (ValueError, struct.error) as e:
+        result["status"] = "corrupt"
+        result["error"] = str(e)
+        return result
+
+    error = duration_error(result["container_duration"], expected_duration)
+    if error:
+        result["status"] = "short"
+        result["error"] = error
+
+    result["checksum"] = file_checksum(file_path, rate_limiter)
+    return result
+
+
+def video_folders(download_path):
+    """
+    Find folders under the download path that hold MP4 files.
+
+    Args:
+        download_path (str): Path to the download directory
+
+    Returns:
+        list: Folder paths
+    """
+    folders = []
+    for root, dirs, files in os.walk(download_path):
+        # Skip in-progress download staging folders
+        dirs[:] = [d for d in dirs if not d.startswith("https")]
+        if any(name.endswith(".mp4") for name in files):
+            folders.append(root)
+    return folders
+
+
+def backfill_durations(download_path, api_key, session=None):
+    """
+    Look up the YouTube duration of indexed videos that were recorded without one.
+
+    Only videos whose URL is in the archive index can be looked up; files
+    downloaded before the index existed are only checked for truncation.
+
+    Args:
+        download_path (str): Path to the download directory
+        api_key (str): YouTube Data API key
+        session (requests.Session, optional): Session to reuse for the API calls
+
+    Returns:
+        int: Number of videos that got a duration
+    """
+    missing = {}
+    for folder in video_folders(download_path):
+        with ArchiveIndex(folder) as index:
+            for name, url in index.missing_durations().items():
+                video_id = video_id_from_url(url)
+                if video_id:
+                    missing.setdefault(video_id, []).append((folder, name))
+    if not missing:
+        return 0
+
+    durations = fetch_video_durations(list(missing), api_key, session or create_session())
+    filled = 0
+    for video_id, duration in durations.items():
+        for folder, name in missing.get(video_id, []):
+            with ArchiveIndex(folder) as index:
+                index.set_expected_duration(name, duration)
+            filled += 1
+    return filled
+
+
+def unchanged_since_check(entry, stat):
+    """
+    Tell whether a file still has the size and modification time of its last good check.
+
+    Args:
+        entry (dict): Index entry of the file, empty if it is not indexed
+        stat (os.stat_result): Current status of the file
+
+    Returns:
+        bool: True if the file looks unchanged since it was last found ok
+    """
+    return (entry.get("status") == "ok"
+            and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime)
+
+
+def scrub(download_path, max_workers=4, max_rate=None, full=False, work_queue=None, progress=None,
+          api_key=None, session=None):
+    """
+    Verify every MP4 under the download path and set aside the bad ones.
+
+    Files whose size and modification time match the last successful check
+    are skipped unless ``full`` is set; when they are checked anyway, a
+    checksum that differs from the stored one marks them corrupt. With an
+    ``api_key``, missing YouTube durations are looked up first, and skipped
+    files whose stored duration turns out short are checked again.
+    Corrupt or short files are renamed
+    with a ``.corrupt`` suffix, so the next channel download fetches them
+    again, and are requeued in ``work_queue`` when one is given.
+
+    Args:
+        download_path (str): Path to the download directory
+        max_workers (int): Number of files checked concurrently
+        max_rate (float, optional): Maximum total read rate in bytes per second
+        full (bool): Check every file, even unchanged ones
+        work_queue (WorkQueue, optional): Queue to requeue bad videos in
+        progress (callable, optional): Called with (done, total) after each file
+        api_key (str, optional): YouTube Data API key to look up missing durations with
+        session (requests.Session, optional): Session to reuse for the API calls
+
+    Returns:
+        dict: Counts of ``ok``, ``corrupt``, ``short`` and ``skipped`` files
+    """
+    rate_limiter = RateLimiter(max_rate)
+    stats = {"ok": 0, "corrupt": 0, "short": 0, "skipped": 0}
+    requeue_urls = []
+
+    if api_key:
+        backfill_durations(download_path, api_key, session)
+
+    # Pick the files to check
+    todo = []
+    for folder in video_folders(download_path):
+        with ArchiveIndex(folder) as index:
+            for name in sorted(os.listdir(folder)):
+                if not name.endswith(".mp4"):
+                    continue
+                stat = os.stat(os.path.join(folder, name))
+                entry = index.get(name) or {}
+                if (not full and unchanged_since_check(entry, stat)
+                        and not duration_error(entry.get("container_duration"), entry.get("expected_duration"))):
+                    stats["skipped"] += 1
+                    continue
+                todo.append((folder, name, stat, entry))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(check_video, os.path.join(folder, name), entry.get("expected_duration"), rate_limiter):
+                (folder, name, stat, entry)
+            for folder, name, stat, entry in todo
+        }
+        for i, future in enumerate(as_completed(futures)):
+            folder, name, stat, entry = futures[future]
+            file_path = os.path.join(folder, name)
+            try:
+                result = future.result()
+            except OSError as e:
+                print(f"Error checking {file_path}: {e}")
+                continue
+
+            if (result["status"] == "ok" and unchanged_since_check(entry, stat)
+                    and entry.get("checksum") and entry["checksum"] != result["checksum"]):
+                # Same size and mtime as the last good check, but different content
+                result["status"] = "corrupt"
+                result["error"] = "checksum changed since the last scrub"
+
+            stats[result["status"]] += 1
+            with ArchiveIndex(folder) as index:
+                index.record_check(
+                    name, stat.st_size, stat.st_mtime, result["checksum"],
+                    result["container_duration"], result["status"], result["error"]
+                )
+            if result["status"] != "ok":
+                print(f"{result['status'].capitalize()} video: {file_path} ({result['error']})")
+                os.replace(file_path, file_path + CORRUPT_SUFFIX)
+                if entry.get("url"):
+                    requeue_urls.append(entry["url"])
+            if progress:
+                progress(i + 1, len(futures))
+
+    if work_queue is not None and requeue_urls:
+        work_queue.requeue(requeue_urls)
+    return stats
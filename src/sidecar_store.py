@@ -0,0 +1,222 @@
+"""
+Per-folder store that packs video descriptions and thumbnails into one SQLite file
+"""
+
+import os
+import re
+import time
+import sqlite3
+import threading
+
+from src.utils import write_if_changed
+
+STORE_FILENAME = "sidecars.sqlite3"
+
+# Sidecar files are named like format_filename() output: "DD-MM-YYYY - Title.txt"
+SIDECAR_PATTERN = re.compile(r"^\d{2}-\d{2}-\d{4} - .*\.(txt|jpg)$")
+
+
+class SidecarStore:
+    """
+    Blob store holding the sidecar files of one folder, keyed by their loose filename.
+
+    A folder with tens of thousands of videos otherwise holds two tiny files
+    per video. Packing them into one SQLite file keeps directory listings and
+    backups fast; ``export`` recreates the loose files when needed.
+
+    Use ``SidecarStore.for_folder`` to share one store between threads.
+    """
+
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, folder, busy_timeout=30.0):
+        """
+        Args:
+            folder (str): Folder whose sidecar files the store holds
+            busy_timeout (float): Seconds to wait for a lock held by another host
+        """
+        self.folder = os.path.abspath(folder)
+        self.path = os.path.join(self.folder, STORE_FILENAME)
+        self._lock = threading.Lock()
+        os.makedirs(self.folder, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=busy_timeout, check_same_thread=False)
+        # Let SQLite serve reads from a memory map of the file
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sidecars (
+                name TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                updated_at REAL
+            )
+            """
+        )
+        self._conn.commit()
+
+    @classmethod
+    def for_folder(cls, folder):
+        """
+        Return the shared store of a folder, opening it on first use.
+
+        Args:
+            folder (str): Folder whose sidecar files the store holds
+
+        Returns:
+            SidecarStore: Store for the folder
+        """
+        folder = os.path.abspath(folder)
+        with cls._stores_lock:
+            if folder not in cls._stores:
+                cls._stores[folder] = cls(folder)
+            return cls._stores[folder]
+
+    def put(self, name, data):
+        """
+        Store a sidecar file, skipping the write if its content is unchanged.
+
+        Args:
+            name (str): Loose filename, e.g. ``15-05-2023 - Title.txt``
+            data (bytes): File content
+
+        Returns:
+            bool: True if the content was written, False if it was already up to date
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM sidecars WHERE name = ?", (name,)).fetchone()
+            if row is not None and row[0] == data:
+                return False
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sidecars (name, data, updated_at) VALUES (?, ?, ?)",
+                (name, sqlite3.Binary(data), time.time())
+            )
+            self._conn.commit()
+            return True
+
+    def get(self, name):
+        """
+        Read a sidecar file.
+
+        Args:
+            name (str): Loose filename
+
+        Returns:
+            bytes: File content, or None if the store does not hold it
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM sidecars WHERE name = ?", (name,)).fetchone()
+        return bytes(row[0]) if row is not None else None
+
+    def rename(self, old_name, new_name):
+        """
+        Store a sidecar file under a new name.
+
+        Args:
+            old_name (str): Current loose filename
+            new_name (str): New loose filename
+
+        Returns:
+            bool: True if the store held the file
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE OR REPLACE sidecars SET name = ?, updated_at = ? WHERE name = ?",
+                (new_name, time.time(), old_name)
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def names(self):
+        """
+        List the stored sidecar files.
+
+        Returns:
+            list: Loose filenames, sorted
+        """
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT name FROM sidecars ORDER BY name")]
+
+    def export(self, destination=None):
+        """
+        Recreate the loose sidecar files.
+
+        Args:
+            destination (str, optional): Folder to write into, defaults to the store's folder
+
+        Returns:
+            int: Number of files written (unchanged files are skipped)
+        """
+        destination = os.path.abspath(destination or self.folder)
+        os.makedirs(destination, exist_ok=True)
+        written = 0
+        for name in self.names():
+            if write_if_changed(os.path.join(destination, name), self.get(name)):
+                written += 1
+        return written
+
+    def pack_loose_files(self, remove=True):
+        """
+        Move existing loose sidecar files of the folder into the store.
+
+        Args:
+            remove (bool): Delete the loose files once they are stored
+
+        Returns:
+            int: Number of files packed
+        """
+        packed = 0
+        for name in sorted(os.listdir(self.folder)):
+            file_path = os.path.join(self.folder, name)
+            if not SIDECAR_PATTERN.match(name) or not os.path.isfile(file_path):
+                continue
+            with open(file_path, 'rb') as f:
+                self.put(name, f.read())
+            if remove:
+                os.remove(file_path)
+            packed += 1
+        return packed
+
+    def close(self):
+        """Close the store and forget it if it is the shared one"""
+        with SidecarStore._stores_lock:
+            if SidecarStore._stores.get(self.folder) is self:
+                del SidecarStore._stores[self.folder]
+        with self._lock:
+            self._conn.close()
+
+
+def write_sidecar(folder, name, data, pack=False):
+    """
+    Write a sidecar file either loose into the folder or into the folder's store.
+
+    Args:
+        folder (str): Folder the video lives in
+        name (str): Loose filename
+        data (bytes): File content
+        pack (bool): Store the file in the folder's SidecarStore
+
+    Returns:
+        bool: True if the content was written, False if it was already up to date
+    """
+    if pack:
+        return SidecarStore.for_folder(folder).put(name, data)
+    return write_if_changed(os.path.join(folder, name), data)
+
+
+def sidecar_folders(download_path):
+    """
+    Find folders under the download path that hold loose sidecar files or a store.
+
+    Args:
+        download_path (str): Path to the download directory
+
+    Returns:
+        list: Folder paths
+    """
+    folders = []
+    for root, dirs, files in os.walk(download_path):
+        # Skip in-progress download staging folders
+        dirs[:] = [d for d in dirs if not d.startswith("https")]
+        if STORE_FILENAME in files or any(SIDECAR_PATTERN.match(name) for name in files):
+            folders.append(root)
+    return folders
@@ -4,15 +4,18 @@ GUI implementation for YouTube Auto Backup
 
 import os
 import sys
+import threading
 from concurrent.futures import ThreadPoolExecutor
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QLineEdit, QPushButton, QMessageBox, QFileDialog
+    QLineEdit, QPushButton, QMessageBox, QFileDialog, QCheckBox
 )
 from PySide6.QtGui import QLinearGradient, QBrush, QPalette, QColor
 from PySide6.QtCore import QThread, Qt
 
 from src.downloader import DownloadWorker
+from src.work_queue import SQLiteWorkQueue
+from src.egress import EgressPool
 
 
 class YouTubeDownloaderApp(QWidget):
@@ -25,6 +28,8 @@ class YouTubeDownloaderApp(QWidget):
         self.executor = ThreadPoolExecutor(max_workers=4)
         self.threads = {}
         self.elements = {}
+        self.egress_pools = {}
+        self.egress_pools_lock = threading.Lock()
 
         self.setup_ui()
 
@@ -53,6 +58,28 @@ class YouTubeDownloaderApp(QWidget):
         api_layout.addWidget(self.api_input)
         main_layout.addLayout(api_layout)
 
+        # Shared work queue (optional)
+        queue_layout = QHBoxLayout()
+        queue_label = QLabel("Shared Queue:")
+        self.queue_input = QLineEdit()
+        self.queue_input.setPlaceholderText("optional, e.g. //nas/backups/work_queue.sqlite3")
+        queue_layout.addWidget(queue_label)
+        queue_layout.addWidget(self.queue_input)
+        main_layout.addLayout(queue_layout)
+
+        # Egress config (optional)
+        egress_layout = QHBoxLayout()
+        egress_label = QLabel("Egress Config:")
+        self.egress_input = QLineEdit()
+        self.egress_input.setPlaceholderText("optional, JSON file listing proxies and source addresses")
+        egress_layout.addWidget(egress_label)
+        egress_layout.addWidget(self.egress_input)
+        main_layout.addLayout(egress_layout)
+
+        # Sidecar storage
+        self.pack_sidecars_checkbox = QCheckBox("Pack descriptions and thumbnails into one file per channel")
+        main_layout.addWidget(self.pack_sidecars_checkbox)
+
         # Download Main Channel
         main_path_layout = QHBoxLayout()
         main_path_label = QLabel("Download Main Channel")
@@ -92,10 +119,13 @@ class YouTubeDownloaderApp(QWidget):
         button_layout = QHBoxLayout()
         self.single_video_button = QPushButton("Download Video")
         self.channel_videos_button = QPushButton("Download Channel")
+        self.metadata_button = QPushButton("Refresh Metadata")
         self.single_video_button.clicked.connect(self.download_video)
         self.channel_videos_button.clicked.connect(self.download_channel)
+        self.metadata_button.clicked.connect(self.refresh_metadata)
         button_layout.addWidget(self.single_video_button)
         button_layout.addWidget(self.channel_videos_button)
+        button_layout.addWidget(self.metadata_button)
         main_layout.addLayout(button_layout)
 
     def browse_download_path(self):
@@ -111,8 +141,14 @@ class YouTubeDownloaderApp(QWidget):
         self.elements[url] = self.single_video_button
         self.single_video_button.setEnabled(False)
         if url:
+            backends = self.open_backends(self.single_video_button, use_queue=False)
+            if backends is None:
+                return
             try:
-                self.executor.submit(self.download_video_thread, url, download_path)
+                self.executor.submit(
+                    self.download_video_thread, url, download_path, backends[1],
+                    self.pack_sidecars_checkbox.isChecked()
+                )
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"An error occurred: {e}")
         else:
@@ -129,13 +165,40 @@ class YouTubeDownloaderApp(QWidget):
             if not 'channel' in url:
                 QMessageBox.critical(self, "Input Error", f"Please Enter Valid Channel Url")
             else:
+                backends = self.open_backends(self.channel_videos_button)
+                if backends is None:
+                    return
                 try:
-                    self.executor.submit(self.download_channel_thread, url, api, download_path)
+                    self.executor.submit(
+                        self.download_channel_thread, url, api, download_path, *backends,
+                        self.pack_sidecars_checkbox.isChecked()
+                    )
                 except Exception as e:
                     QMessageBox.critical(self, "Error", f"An error occurred: {e}")
         else:
             QMessageBox.warning(self, "Input Error", "Please provide a valid YouTube URL.")
     
+    def refresh_metadata(self):
+        """Refresh descriptions and thumbnails of a YouTube channel"""
+        url = self.url_input.text()
+        api = self.api_input.text()
+        download_path = self.path_input.text()
+        if url:
+            if not 'channel' in url:
+                QMessageBox.critical(self, "Input Error", f"Please Enter Valid Channel Url")
+            else:
+                self.elements[url] = self.metadata_button
+                self.metadata_button.setEnabled(False)
+                try:
+                    self.executor.submit(
+                        self.refresh_metadata_thread, url, api, download_path,
+                        self.pack_sidecars_checkbox.isChecked()
+                    )
+                except Exception as e:
+                    QMessageBox.critical(self, "Error", f"An error occurred: {e}")
+        else:
+            QMessageBox.warning(self, "Input Error", "Please provide a valid YouTube URL.")
+
     def download_main_channel(self):
         """Download videos from the main channel"""
         url = "https://www.youtube.com/channel/UC_4NoVAkQzeSaxCgm-to25A/"  # replace with your channel link
@@ -144,8 +207,14 @@ class YouTubeDownloaderApp(QWidget):
         api = self.api_input.text()
         download_path = self.path_input.text()
         if url:
+            backends = self.open_backends(self.main_browse_button)
+            if backends is None:
+                return
             try:
-                self.executor.submit(self.download_channel_thread, url, api, download_path)
+                self.executor.submit(
+                    self.download_channel_thread, url, api, download_path, *backends,
+                    self.pack_sidecars_checkbox.isChecked()
+                )
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"An error occurred: {e}")
         else:
@@ -159,8 +228,14 @@ class YouTubeDownloaderApp(QWidget):
         api = self.api_input.text()
         download_path = self.path_input.text()
         if url:
+            backends = self.open_backends(self.yellow_browse_button)
+            if backends is None:
+                return
             try:
-                self.executor.submit(self.download_channel_thread, url, api, download_path)
+                self.executor.submit(
+                    self.download_channel_thread, url, api, download_path, *backends,
+                    self.pack_sidecars_checkbox.isChecked()
+                )
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"An error occurred: {e}")
         else:
@@ -174,34 +249,99 @@ class YouTubeDownloaderApp(QWidget):
         api = self.api_input.text()
         download_path = self.path_input.text()
         if url:
+            backends = self.open_backends(self.small_browse_button)
+            if backends is None:
+                return
             try:
-                self.executor.submit(self.download_channel_thread, url, api, download_path)
+                self.executor.submit(
+                    self.download_channel_thread, url, api, download_path, *backends,
+                    self.pack_sidecars_checkbox.isChecked()
+                )
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"An error occurred: {e}")
         else:
             QMessageBox.warning(self, "Input Error", "Please provide a valid YouTube URL.")
 
-    def download_video_thread(self, url, download_path):
+    def get_egress_pool(self):
+        """Return the egress pool for the configured file, shared by all downloads"""
+        config_path = self.egress_input.text().strip()
+        if not config_path:
+            return None
+        with self.egress_pools_lock:
+            if config_path not in self.egress_pools:
+                self.egress_pools[config_path] = EgressPool.from_config(config_path)
+            return self.egress_pools[config_path]
+
+    def open_backends(self, button, use_queue=True):
+        """
+        Open the shared work queue and egress pool before a download starts.
+
+        This runs on the GUI thread so that a wrong path or a broken config is
+        reported to the user instead of being lost in the executor.
+
+        Args:
+            button (QPushButton): Button to re-enable if the settings are invalid
+            use_queue (bool): Whether the download uses the shared work queue
+
+        Returns:
+            tuple: (work_queue, egress_pool), each None if not configured;
+            None if either could not be opened
+        """
+        queue_path = self.queue_input.text().strip()
+        try:
+            work_queue = SQLiteWorkQueue(queue_path) if use_queue and queue_path else None
+        except Exception as e:
+            QMessageBox.critical(self, "Queue Error", f"Could not open the shared queue {queue_path}: {e}")
+            button.setEnabled(True)
+            return None
+        try:
+            egress_pool = self.get_egress_pool()
+        except Exception as e:
+            QMessageBox.critical(self, "Egress Config Error", f"Could not load the egress config: {e}")
+            button.setEnabled(True)
+            return None
+        return work_queue, egress_pool
+
+    def download_video_thread(self, url, download_path, egress_pool=None, pack_sidecars=False):
         """Start a thread to download a single video"""
         thread = QThread()
         self.threads[url] = thread
-        worker = DownloadWorker()
+        worker = DownloadWorker(
+            pack_sidecars=pack_sidecars,
+            egress_pool=egress_pool
+        )
         worker.moveToThread(thread)
         worker.finished.connect(self.video_download_complete)
         thread.started.connect(lambda: worker.download_youtube_video(url, download_path))
         thread.start()
 
-    def download_channel_thread(self, url, api, download_path):
+    def download_channel_thread(self, url, api, download_path, work_queue=None, egress_pool=None,
+                                pack_sidecars=False):
         """Start a thread to download a channel's videos"""
         thread = QThread()
         self.threads[url] = thread
-        worker = DownloadWorker()
+        worker = DownloadWorker(
+            work_queue=work_queue,
+            pack_sidecars=pack_sidecars,
+            egress_pool=egress_pool
+        )
         worker.moveToThread(thread)
         worker.progress.connect(self.update_progress)
         worker.finished.connect(self.channel_download_complete)
         thread.started.connect(lambda: worker.download_channel_videos(url, api, download_path))
         thread.start()
 
+    def refresh_metadata_thread(self, url, api, download_path, pack_sidecars=False):
+        """Start a thread to refresh a channel's descriptions and thumbnails"""
+        thread = QThread()
+        self.threads[url] = thread
+        worker = DownloadWorker(pack_sidecars=pack_sidecars)
+        worker.moveToThread(thread)
+        worker.progress.connect(self.update_progress)
+        worker.finished.connect(self.metadata_refresh_complete)
+        thread.started.connect(lambda: worker.refresh_channel_metadata(url, api, download_path))
+        thread.start()
+
     def update_progress(self, url, progress):
         """Update button text and color dynamically based on progress"""
         # Extract progress values
@@ -259,4 +399,23 @@ class YouTubeDownloaderApp(QWidget):
             button.setAutoFillBackground(True)
 
         # Show a success message
-        QMessageBox.information(self, "Success", "Channel downloaded successfully!") 
\ No newline at end of file
+        QMessageBox.information(self, "Success", "Channel downloaded successfully!")
+
+    def metadata_refresh_complete(self, url):
+        """Handle the completion of a metadata refresh"""
+        thread = self.threads.get(url)
+        if thread:
+            thread.quit()
+            thread.wait()
+
+        button = self.elements.get(url)
+        if button:
+            button.setText("Refresh Metadata")
+            button.setEnabled(True)
+
+            palette = button.palette()
+            palette.setColor(QPalette.Button, QColor("#3c3c3c"))
+            button.setPalette(palette)
+            button.setAutoFillBackground(True)
+
+        QMessageBox.information(self, "Success", "Channel metadata refreshed successfully!")
@@ -90,4 +90,32 @@ def write_to_csv(file_path, channel_name, title, url):
             writer.writerow(["Channel Name", "Video Title", "Video URL"])
         
         # Write the row data
-        writer.writerow([channel_name, title, url]) 
\ No newline at end of file
+        writer.writerow([channel_name, title, url])
+
+
+def write_if_changed(file_path, data):
+    """
+    Write data to a file only if its content differs from what is on disk.
+
+    The file is written to a temporary name first and then moved into place,
+    so readers never see a partially written file.
+
+    Args:
+        file_path (str): Path to the file
+        data (bytes): New file content
+
+    Returns:
+        bool: True if the file was written, False if it was already up to date
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
+    return True
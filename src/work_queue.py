@@ -0,0 +1,386 @@
+"""
+Shared work queue for distributing video downloads across hosts
+"""
+
+import os
+import time
+import socket
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+
+def default_worker_id():
+    """
+    Build an identifier for this worker that is unique across hosts.
+
+    Returns:
+        str: Worker identifier in the form ``hostname-pid``
+    """
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue(ABC):
+    """
+    Interface for work-queue backends.
+
+    A job is a dict with the keys ``url``, ``channel_name``, ``title`` and
+    ``upload_date``. Workers claim jobs with a time-limited lease, renew it
+    with heartbeats while working, and release it with ``complete`` or
+    ``fail``. A job whose lease expires is handed to the next worker that
+    calls ``claim``, unless it has used up its attempts.
+    """
+
+    @abstractmethod
+    def enqueue(self, jobs):
+        """
+        Add jobs to the queue. Jobs already in the queue are left untouched.
+
+        Args:
+            jobs (list): List of job dictionaries
+
+        Returns:
+            int: Number of newly added jobs
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, worker_id, lease_seconds, channel_name=None):
+        """
+        Lease the next available job.
+
+        Args:
+            worker_id (str): Identifier of the claiming worker
+            lease_seconds (float): Lease duration
+            channel_name (str, optional): Only claim jobs for this channel
+
+        Returns:
+            dict: The claimed job, or None if nothing is available
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def heartbeat(self, url, worker_id, lease_seconds):
+        """
+        Extend the lease on a job held by this worker.
+
+        Args:
+            url (str): Job URL
+            worker_id (str): Identifier of the worker holding the lease
+            lease_seconds (float): New lease duration from now
+
+        Returns:
+            bool: False if the worker no longer holds the lease
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def complete(self, url, worker_id):
+        """
+        Mark a leased job as done.
+
+        Args:
+            url (str): Job URL
+            worker_id (str): Identifier of the worker holding the lease
+
+        Returns:
+            bool: False if the worker no longer holds the lease
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def fail(self, url, worker_id, error):
+        """
+        Release a leased job after an error so it can be retried.
+
+        Args:
+            url (str): Job URL
+            worker_id (str): Identifier of the worker holding the lease
+            error (str): Error description
+
+        Returns:
+            bool: False if the worker no longer holds the lease
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def requeue(self, urls):
+        """
+        Make finished jobs available again, e.g. after their file was found corrupt
+        or went missing, or after a job failed on a transient outage.
+
+        Args:
+            urls (list): Job URLs
+
+        Returns:
+            int: Number of jobs requeued
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def active_workers(self):
+        """
+        List the workers that currently hold an unexpired lease.
+
+        Returns:
+            set: Worker identifiers
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def counts(self, channel_name=None):
+        """
+        Count jobs by status.
+
+        Args:
+            channel_name (str, optional): Only count jobs for this channel
+
+        Returns:
+            dict: Mapping of status to number of jobs
+        """
+        raise NotImplementedError
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Work queue stored in a SQLite database, meant to live on shared storage.
+
+    Every operation opens its own short-lived connection and claims run in an
+    immediate transaction, so several hosts and threads can share one file.
+    Rollback journaling is used instead of WAL, which does not work on
+    network filesystems.
+    """
+
+    def __init__(self, path, max_attempts=5, busy_timeout=30.0):
+        """
+        Args:
+            path (str): Path to the SQLite database file
+            max_attempts (int): Claims after which a failing job is given up
+            busy_timeout (float): Seconds to wait for a lock held by another host
+        """
+        self.path = os.path.abspath(path)
+        self.max_attempts = max_attempts
+        self.busy_timeout = busy_timeout
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # The journal mode cannot be changed inside a transaction
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            conn.close()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    url TEXT PRIMARY KEY,
+                    channel_name TEXT,
+                    title TEXT,
+                    upload_date TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    updated_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_expires)")
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection and run the block in an immediate transaction"""
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def enqueue(self, jobs):
+        now = time.time()
+        with self._connect() as conn:
+            added = 0
+            for job in jobs:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO jobs (url, channel_name, title, upload_date, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (job['url'], job.get('channel_name'), job.get('title'), job.get('upload_date'), now)
+                )
+                added += cursor.rowcount
+            return added
+
+    def claim(self, worker_id, lease_seconds, channel_name=None):
+        """
+        Lease the next available job, reclaiming expired leases.
+
+        An expired lease on a job that has used up ``max_attempts`` means its
+        workers keep crashing or hanging on it, so it is marked failed instead.
+
+        Args:
+            worker_id (str): Identifier of the claiming worker
+            lease_seconds (float): Lease duration
+            channel_name (str, optional): Only claim jobs for this channel
+
+        Returns:
+            dict: The claimed job, or None if nothing is available
+        """
+        now = time.time()
+        query = (
+            "SELECT * FROM jobs "
+            "WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?))"
+        )
+        params = [now]
+        if channel_name is not None:
+            query += " AND channel_name = ?"
+            params.append(channel_name)
+        query += " ORDER BY attempts, rowid LIMIT 1"
+
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', lease_expires = NULL, "
+                "last_error = 'lease expired on the last attempt', updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', worker_id = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE url = ?",
+                (worker_id, now + lease_seconds, now, row['url'])
+            )
+            return {
+                'url': row['url'],
+                'channel_name': row['channel_name'],
+                'title': row['title'],
+                'upload_date': row['upload_date'],
+                'attempts': row['attempts'] + 1,
+            }
+
+    def heartbeat(self, url, worker_id, lease_seconds):
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE url = ? AND worker_id = ? AND status = 'leased'",
+                (now + lease_seconds, now, url, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, url, worker_id):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', lease_expires = NULL, last_error = NULL, updated_at = ? "
+                "WHERE url = ? AND worker_id = ? AND status = 'leased'",
+                (time.time(), url, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, url, worker_id, error):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_expires = NULL, last_error = ?, updated_at = ? "
+                "WHERE url = ? AND worker_id = ? AND status = 'leased'",
+                (self.max_attempts, str(error), time.time(), url, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def requeue(self, urls):
+        now = time.time()
+        with self._connect() as conn:
+            requeued = 0
+            for url in urls:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'pending', worker_id = NULL, lease_expires = NULL, "
+                    "attempts = 0, last_error = NULL, updated_at = ? "
+                    "WHERE url = ? AND status IN ('done', 'failed')",
+                    (now, url)
+                )
+                requeued += cursor.rowcount
+            return requeued
+
+    def active_workers(self):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT worker_id FROM jobs WHERE status = 'leased' AND lease_expires >= ?",
+                (time.time(),)
+            )
+            return {row[0] for row in rows}
+
+    def counts(self, channel_name=None):
+        query = "SELECT status, COUNT(*) FROM jobs"
+        params = []
+        if channel_name is not None:
+            query += " WHERE channel_name = ?"
+            params.append(channel_name)
+        query += " GROUP BY status"
+        with self._connect() as conn:
+            return {status: count for status, count in conn.execute(query, params)}
+
+
+class LeaseHeartbeat:
+    """
+    Context manager that keeps a job's lease alive from a background thread.
+
+    ``lost`` becomes True once the lease is known or assumed to be gone; the
+    work done under it must then be abandoned.
+
+    Example:
+        with LeaseHeartbeat(queue, url, worker_id, lease_seconds=300):
+            download(url)
+    """
+
+    def __init__(self, queue, url, worker_id, lease_seconds, interval=None):
+        """
+        Args:
+            queue (WorkQueue): Queue holding the job
+            url (str): Job URL
+            worker_id (str): Identifier of the worker holding the lease
+            lease_seconds (float): Lease duration requested on each heartbeat
+            interval (float, optional): Seconds between heartbeats, defaults to a third of the lease
+        """
+        self.queue = queue
+        self.url = url
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.interval = interval if interval is not None else lease_seconds / 3
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._renewed = time.monotonic()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.url, self.worker_id, self.lease_seconds):
+                    print(f"Lost lease on {self.url}")
+                    self.lost = True
+                    return
+                self._renewed = time.monotonic()
+            except Exception as e:
+                print(f"Error renewing lease on {self.url}: {e}")
+                # If renewals kept failing for a whole lease, another worker may own the job now
+                if time.monotonic() - self._renewed >= self.lease_seconds:
+                    print(f"Lost lease on {self.url}")
+                    self.lost = True
+                    return
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
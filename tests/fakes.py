@@ -0,0 +1,40 @@
+"""
+Stand-ins for requests objects shared by the tests
+"""
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, json_data=None, content=b''):
+        self.json_data = json_data
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.json_data
+
+
+class FakeSession:
+    """Session serving canned Data API videos.list items and thumbnail responses"""
+
+    def __init__(self, videos, thumbnails=None):
+        """
+        Args:
+            videos (dict): Video resources by id, returned by videos.list calls
+            thumbnails (dict, optional): Thumbnail content by URL
+        """
+        self.videos = videos
+        self.thumbnails = thumbnails or {}
+        self.requests = []
+        self.requested_ids = []
+
+    def get(self, url, params=None):
+        self.requests.append(url)
+        if params is not None:
+            ids = params["id"].split(",")
+            self.requested_ids.extend(ids)
+            return FakeResponse({"items": [self.videos[i] for i in ids if i in self.videos]})
+        return FakeResponse(content=self.thumbnails[url])
@@ -0,0 +1,210 @@
+"""
+Test cases for the downloader module
+"""
+
+import unittest
+import subprocess
+import tempfile
+import sys
+import os
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class TestLazyImports(unittest.TestCase):
+    """Test that heavy dependencies are only loaded when needed"""
+
+    def test_import_does_not_load_heavy_modules(self):
+        """Test that importing src.downloader does not import yt_dlp or requests"""
+        code = (
+            "import sys; import src.downloader; "
+            "print(','.join(m for m in ('yt_dlp', 'requests') if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), '')
+
+    def test_prewarm_loads_yt_dlp(self):
+        """Test that prewarming imports yt-dlp and leaves a probe instance in the pool"""
+        from src import downloader
+
+        downloader.start_prewarm().join()
+        self.assertIn('yt_dlp', sys.modules)
+        with downloader._probe_pool_lock:
+            prewarmed = downloader._probe_pool[-1]
+        with downloader.probe_ydl() as ydl:
+            self.assertIs(ydl, prewarmed)
+
+    def test_probe_instances_are_pooled(self):
+        """Test that probes in later threads reuse idle instances, and concurrent probes do not share one"""
+        import threading
+        from src import downloader
+
+        with downloader.probe_ydl() as first:
+            with downloader.probe_ydl() as second:
+                self.assertIsNot(first, second)
+        reused = []
+
+        def probe():
+            with downloader.probe_ydl() as ydl:
+                reused.append(ydl)
+
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+        self.assertIn(reused[0], (first, second))
+
+
+class TestStagingFolders(unittest.TestCase):
+    """Test cases for staging folder cleanup"""
+
+    def test_keeps_folders_of_active_workers(self):
+        """Test that only staging folders of workers without leases are removed"""
+        from src.downloader import remove_staging_folders
+        from src.utils import sanitize_filename
+
+        url = 'https://www.youtube.com/watch?v=abc'
+        prefix = sanitize_filename(url)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in (prefix, f'{prefix}.dead', f'{prefix}.alive', f'{prefix}d.dead'):
+                os.makedirs(os.path.join(tmpdir, name))
+            remove_staging_folders(tmpdir, url, active_workers={'alive'})
+            self.assertEqual(sorted(os.listdir(tmpdir)), sorted([f'{prefix}.alive', f'{prefix}d.dead']))
+
+
+class TestSidecars(unittest.TestCase):
+    """Test cases for saving descriptions and thumbnails"""
+
+    def test_store_error_keeps_loose_file(self):
+        """Test that a sidecar store that cannot be opened does not lose the file"""
+        from src.downloader import DownloadWorker
+        from src.sidecar_store import STORE_FILENAME
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            staged_path = os.path.join(tmpdir, 'staged.txt')
+            with open(staged_path, 'w') as f:
+                f.write('description')
+            os.mkdir(os.path.join(tmpdir, STORE_FILENAME))  # The store cannot be opened
+            DownloadWorker(pack_sidecars=True).save_sidecar(staged_path, tmpdir, '15-05-2023 - Video.txt')
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, '15-05-2023 - Video.txt')))
+            self.assertFalse(os.path.exists(staged_path))
+
+
+class TestEgressFailures(unittest.TestCase):
+    """Test cases for how download errors count against egresses"""
+
+    def download_with_error(self, message):
+        from unittest import mock
+        import yt_dlp
+        from src.downloader import DownloadWorker
+        from src.egress import Egress, EgressPool
+
+        pool = EgressPool([Egress('a'), Egress('b')], max_failures=2)
+        ydl = mock.MagicMock()
+        ydl.__enter__.return_value.extract_info.side_effect = yt_dlp.utils.DownloadError(message)
+        with tempfile.TemporaryDirectory() as tmpdir, mock.patch('yt_dlp.YoutubeDL', return_value=ydl):
+            worker = DownloadWorker(egress_pool=pool)
+            ok = worker.download_youtube_video(
+                'https://www.youtube.com/watch?v=abc', tmpdir, 'Title', '2023-05-15T00:00:00Z'
+            )
+        self.assertFalse(ok)
+        return pool.stats()
+
+    def test_unavailable_video_keeps_pool_usable(self):
+        """Test that a video failing on every attempt does not cool down the egresses"""
+        stats = self.download_with_error("ERROR: [youtube] abc: Private video")
+        self.assertEqual([(s['failures'], s['cooling_down'], s['active']) for s in stats],
+                         [(0, False, 0), (0, False, 0)])
+
+    def test_rate_limits_cool_down_egresses(self):
+        """Test that rate-limited attempts count against the egresses they went through"""
+        stats = self.download_with_error("ERROR: HTTP Error 429: Too Many Requests")
+        self.assertTrue(all(s['cooldowns'] for s in stats))
+
+
+class TestQueueDownloads(unittest.TestCase):
+    """Test cases for downloading a channel through the shared work queue"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmpdir.name, 'Channel')
+        os.makedirs(self.folder)
+        self.queue_path = os.path.join(self.tmpdir.name, 'queue.sqlite3')
+        self.videos = [
+            {'url': f'https://www.youtube.com/watch?v=video{i}', 'title': f'Video {i}',
+             'upload_date': '2023-05-15T00:00:00Z'}
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_channel(self, download):
+        """Download the channel with ``download`` standing in for download_youtube_video"""
+        from unittest import mock
+        from src.downloader import DownloadWorker
+        from src.work_queue import SQLiteWorkQueue
+
+        queue = SQLiteWorkQueue(self.queue_path, max_attempts=2)
+        worker = DownloadWorker(work_queue=queue, worker_id='a')
+        calls = []
+
+        def fake_download(url, download_path, title, upload_date, worker_id=None, lease=None):
+            calls.append(url)
+            return download(url, title, lease)
+
+        with mock.patch.object(worker, 'download_youtube_video', fake_download), \
+                mock.patch('src.downloader.write_to_csv'):
+            worker.download_channel_from_queue(
+                'https://www.youtube.com/channel/x', 'Channel', self.videos, self.folder
+            )
+        return queue, calls
+
+    def save(self, title):
+        from datetime import datetime
+        from src.utils import format_filename
+
+        with open(os.path.join(self.folder, format_filename(datetime(2023, 5, 15), title, 'mp4')), 'wb') as f:
+            f.write(b'video')
+        return True
+
+    def take_over(self, url, lease):
+        """Act as if another worker took the job over and finished it"""
+        import sqlite3
+
+        conn = sqlite3.connect(self.queue_path)
+        conn.execute("UPDATE jobs SET status = 'done', worker_id = 'b' WHERE url = ?", (url,))
+        conn.commit()
+        conn.close()
+        lease.lost = True
+        return False
+
+    def test_complete_fail_and_lost_lease(self):
+        """Test that workers complete, fail and abandon jobs, and a later run retries missing videos"""
+        urls = [video['url'] for video in self.videos]
+
+        def first_run(url, title, lease):
+            if url == urls[0]:
+                return self.save(title)
+            if url == urls[1]:
+                return False
+            return self.take_over(url, lease)
+
+        queue, calls = self.run_channel(first_run)
+        self.assertEqual(calls, [urls[0], urls[1], urls[2], urls[1]])
+        self.assertEqual(queue.counts(), {'done': 2, 'failed': 1})
+        # The abandoned job keeps the other worker's result
+        self.assertFalse(queue.complete(urls[2], 'a'))
+
+        # The failed video and the one whose file is not here are retried; the saved one is not
+        queue, calls = self.run_channel(lambda url, title, lease: self.save(title))
+        self.assertEqual(sorted(calls), [urls[1], urls[2]])
+        self.assertEqual(queue.counts(), {'done': 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
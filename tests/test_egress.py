@@ -0,0 +1,227 @@
+"""
+Test cases for the egress pool
+"""
+
+import unittest
+import tempfile
+import threading
+import urllib.request
+import json
+import sys
+import os
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.egress import Egress, EgressPool, is_route_error, transfer_hook
+
+VIDEO_BYTES = b'\x00' * 200000
+
+
+class FakeClock:
+    """Manually advanced time source"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class VideoHandler(BaseHTTPRequestHandler):
+    """Serves a fixed video file"""
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(len(VIDEO_BYTES)))
+        self.end_headers()
+
+    def do_GET(self):
+        self.do_HEAD()
+        self.wfile.write(VIDEO_BYTES)
+
+    def log_message(self, *args):
+        pass
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """Plain HTTP forward proxy that records the URLs it relays"""
+
+    def relay(self, method):
+        self.server.seen.append(self.path)
+        request = urllib.request.Request(self.path, method=method, headers={
+            key: value for key, value in self.headers.items() if key.lower() not in ('proxy-connection', 'host')
+        })
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+        with opener.open(request) as response:
+            body = response.read()
+            self.send_response(response.status)
+            for key, value in response.getheaders():
+                if key.lower() not in ('transfer-encoding', 'connection'):
+                    self.send_header(key, value)
+            self.end_headers()
+            if method == 'GET':
+                self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.relay('HEAD')
+
+    def do_GET(self):
+        self.relay('GET')
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(handler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.seen = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TestEgressPool(unittest.TestCase):
+    """Test cases for EgressPool"""
+
+    def test_round_robin_skips_cooled_down_egress(self):
+        """Test that a slow egress is left out until its cooldown ends"""
+        clock = FakeClock()
+        egresses = [Egress('a'), Egress('b'), Egress('c')]
+        pool = EgressPool(egresses, min_throughput=1000, cooldown_seconds=60, clock=clock)
+
+        self.assertEqual([pool.acquire().name for _ in range(3)], ['a', 'b', 'c'])
+        pool.release(egresses[0], 100, 1.0)
+        pool.release(egresses[1], 5000, 1.0)
+        pool.release(egresses[2], 5000, 1.0)
+
+        self.assertEqual([pool.acquire().name for _ in range(4)], ['b', 'c', 'b', 'c'])
+        clock.now = 61
+        self.assertIn('a', [pool.acquire().name for _ in range(3)])
+
+    def test_all_cooled_down_uses_first_to_return(self):
+        """Test that downloads continue when every egress is cooling down"""
+        clock = FakeClock()
+        egresses = [Egress('a'), Egress('b')]
+        pool = EgressPool(egresses, min_throughput=1000, cooldown_seconds=60, clock=clock)
+        pool.release(pool.acquire(), 10, 1.0)
+        clock.now = 5
+        pool.release(pool.acquire(), 10, 1.0)
+        self.assertEqual(pool.acquire().name, 'a')
+
+    def test_consecutive_failures_cool_down(self):
+        """Test that an egress failing several downloads in a row is left out"""
+        clock = FakeClock()
+        egresses = [Egress('a'), Egress('b')]
+        pool = EgressPool(egresses, max_failures=2, cooldown_seconds=60, clock=clock)
+
+        pool.release(pool.acquire(), 0, 0, failed=True)
+        pool.release(pool.acquire(), 5000, 1.0)
+        # A success in between resets the count
+        pool.release(pool.acquire(), 5000, 1.0)
+        pool.release(pool.acquire(), 5000, 1.0)
+        self.assertFalse(pool.stats()[0]['cooling_down'])
+
+        pool.release(pool.acquire(), 0, 0, failed=True)
+        pool.release(pool.acquire(), 5000, 1.0)
+        pool.release(pool.acquire(), 0, 0, failed=True)
+        self.assertEqual(pool.stats()[0]['cooldowns'], 1)
+        self.assertEqual([pool.acquire().name for _ in range(3)], ['b', 'b', 'b'])
+
+    def test_route_errors(self):
+        """Test that rate limits and connection errors count against the egress, video errors do not"""
+        self.assertTrue(is_route_error(Exception("ERROR: unable to download video data: HTTP Error 429: Too Many Requests")))
+        self.assertTrue(is_route_error(Exception("Sign in to confirm you're not a bot")))
+        wrapped = Exception("ERROR: Unable to download webpage")
+        wrapped.exc_info = (ConnectionRefusedError, ConnectionRefusedError(111, 'refused'), None)
+        self.assertTrue(is_route_error(wrapped))
+        self.assertFalse(is_route_error(Exception("ERROR: [youtube] abc: Private video")))
+        self.assertFalse(is_route_error(Exception("ERROR: Requested format is not available")))
+
+    def test_cancel_does_not_count_download(self):
+        """Test that an egress returned unused counts neither a download nor a failure"""
+        pool = EgressPool([Egress('a')])
+        egress = pool.acquire()
+        pool.cancel(egress)
+        stats = pool.stats()[0]
+        self.assertEqual((stats['active'], stats['downloads'], stats['failures']), (0, 0, 0))
+
+    def test_transfer_hook_times_transfers(self):
+        """Test that only the transfer time reported for finished files is counted"""
+        transfer = {'bytes': 0, 'seconds': 0}
+        hook = transfer_hook(transfer)
+        hook({'status': 'downloading', 'downloaded_bytes': 10, 'elapsed': 0.5})
+        hook({'status': 'finished', 'total_bytes': 1000, 'elapsed': 2.0})
+        hook({'status': 'finished', 'downloaded_bytes': 500, 'elapsed': 1.0})
+        self.assertEqual(transfer, {'bytes': 1500, 'seconds': 3.0})
+
+    def test_least_loaded(self):
+        """Test that least_loaded prefers idle, then faster egresses"""
+        egresses = [Egress('slow'), Egress('fast')]
+        pool = EgressPool(egresses, strategy='least_loaded')
+        pool.release(pool.acquire(), 1000, 1.0)
+        pool.release(pool.acquire(), 9000, 1.0)
+
+        first = pool.acquire()
+        second = pool.acquire()
+        self.assertEqual((first.name, second.name), ('fast', 'slow'))
+
+    def test_stats_are_exported(self):
+        """Test that stats are written to the configured file"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_path = os.path.join(tmpdir, 'egress.json')
+            stats_path = os.path.join(tmpdir, 'stats.json')
+            with open(config_path, 'w', encoding='utf-8') as f:
+                json.dump({'stats_path': stats_path, 'egresses': [
+                    {'name': 'direct'}, {'proxy': 'socks5://127.0.0.1:1080'}, {'source_address': '127.0.0.1'}
+                ]}, f)
+
+            pool = EgressPool.from_config(config_path)
+            self.assertEqual([e.name for e in pool.egresses], ['direct', 'socks5://127.0.0.1:1080', '127.0.0.1'])
+            self.assertEqual(pool.egresses[2].ydl_options(), {'source_address': '127.0.0.1'})
+
+            pool.release(pool.acquire(), 4000, 2.0)
+            with open(stats_path, encoding='utf-8') as f:
+                stats = json.load(f)
+            self.assertEqual(stats[0]['bytes'], 4000)
+            self.assertEqual(stats[0]['average_throughput'], 2000)
+            self.assertEqual(stats[1]['downloads'], 0)
+
+    def test_download_through_local_proxy(self):
+        """Test that yt-dlp routes through the acquired egress and its bytes are counted"""
+        import yt_dlp
+
+        video_server = start_server(VideoHandler)
+        proxies = [start_server(ProxyHandler) for _ in range(2)]
+        for server in [video_server] + proxies:
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+
+        pool = EgressPool([
+            Egress(f'proxy{i}', proxy=f'http://127.0.0.1:{proxy.server_address[1]}') for i, proxy in enumerate(proxies)
+        ])
+        url = f'http://127.0.0.1:{video_server.server_address[1]}/video.mp4'
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i in range(2):
+                egress = pool.acquire()
+                transfer = {'bytes': 0}
+                ydl_opts = {
+                    'outtmpl': os.path.join(tmpdir, f'{i}.%(ext)s'),
+                    'quiet': True,
+                    'noprogress': True,
+                    'progress_hooks': [transfer_hook(transfer)],
+                }
+                ydl_opts.update(egress.ydl_options())
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    ydl.download([url])
+                pool.release(egress, transfer['bytes'], 0.5)
+
+        for proxy in proxies:
+            self.assertIn(url, proxy.seen)
+        self.assertEqual([stat['bytes'] for stat in pool.stats()], [len(VIDEO_BYTES)] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
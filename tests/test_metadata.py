@@ -0,0 +1,151 @@
+"""
+Test cases for the metadata-only backup
+"""
+
+import unittest
+import tempfile
+from datetime import datetime
+import sys
+import os
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.metadata import video_id_from_url, best_thumbnail_url, parse_duration, refresh_metadata
+from src.archive_index import ArchiveIndex
+from src.utils import format_filename
+from tests.fakes import FakeSession
+
+
+def make_video(video_id, title, description):
+    return {
+        "id": video_id,
+        "snippet": {
+            "title": title,
+            "description": description,
+            "thumbnails": {"high": {"url": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"}},
+        },
+    }
+
+
+def make_stats(**counts):
+    stats = {"descriptions": 0, "thumbnails": 0, "renamed": 0, "unchanged": 0, "missing": 0, "errors": 0}
+    stats.update(counts)
+    return stats
+
+
+def touch(file_path):
+    with open(file_path, "wb") as f:
+        f.write(b"video")
+
+
+class TestMetadata(unittest.TestCase):
+    """Test cases for metadata helpers"""
+
+    def test_video_id_from_url(self):
+        """Test that video ids are extracted from watch and short URLs"""
+        self.assertEqual(video_id_from_url("https://www.youtube.com/watch?v=dQw4w9WgXcQ"), "dQw4w9WgXcQ")
+        self.assertEqual(video_id_from_url("https://youtu.be/dQw4w9WgXcQ"), "dQw4w9WgXcQ")
+        self.assertIsNone(video_id_from_url("https://www.youtube.com/channel/UC_x5XG1OV2P6uZZ5FSM9Ttw"))
+
+    def test_best_thumbnail_url(self):
+        """Test that the largest thumbnail is preferred"""
+        thumbnails = {"default": {"url": "small"}, "maxres": {"url": "large"}, "high": {"url": "medium"}}
+        self.assertEqual(best_thumbnail_url(thumbnails), "large")
+        self.assertIsNone(best_thumbnail_url({}))
+
+    def test_parse_duration(self):
+        """Test that ISO 8601 durations from the Data API are converted to seconds"""
+        self.assertEqual(parse_duration("PT1H2M3S"), 3723)
+        self.assertEqual(parse_duration("PT45S"), 45)
+        self.assertEqual(parse_duration("P1DT1S"), 86401)
+        self.assertIsNone(parse_duration("not a duration"))
+
+    def test_refresh_metadata_writes_only_changes(self):
+        """Test that a refresh batches API calls and skips unchanged files"""
+        count = 120
+        api_videos = {f"id{i}": make_video(f"id{i}", f"Video {i}", f"Description {i}") for i in range(count)}
+        thumbnails = {f"https://i.ytimg.com/vi/id{i}/hqdefault.jpg": b"jpeg %d" % i for i in range(count)}
+        videos = [
+            {"url": f"https://www.youtube.com/watch?v=id{i}", "upload_date": "2023-05-15T10:00:00Z"}
+            for i in range(count)
+        ]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i in range(count):
+                touch(os.path.join(tmpdir, format_filename(datetime(2023, 5, 15), f"Video {i}", "mp4")))
+            session = FakeSession(api_videos, thumbnails)
+            stats = refresh_metadata(videos, "key", tmpdir, session=session)
+            self.assertEqual(stats, make_stats(descriptions=count, thumbnails=count))
+            # 120 ids fit in three videos.list calls
+            self.assertEqual(session.requests.count("https://www.googleapis.com/youtube/v3/videos"), 3)
+
+            api_videos["id7"]["snippet"]["description"] = "Updated"
+            stats = refresh_metadata(videos, "key", tmpdir, session=FakeSession(api_videos, thumbnails))
+            self.assertEqual(stats, make_stats(descriptions=1, unchanged=2 * count - 1))
+
+            description_path = os.path.join(tmpdir, format_filename(datetime(2023, 5, 15), "Video 7", "txt"))
+            with open(description_path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), "Updated")
+
+
+    def test_refresh_metadata_skips_videos_not_backed_up(self):
+        """Test that no sidecar files are written for videos without a local mp4"""
+        api_videos = {"id0": make_video("id0", "Video 0", "Description 0")}
+        thumbnails = {"https://i.ytimg.com/vi/id0/hqdefault.jpg": b"jpeg"}
+        videos = [{"url": "https://www.youtube.com/watch?v=id0", "upload_date": "2023-05-15T10:00:00Z"}]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            stats = refresh_metadata(videos, "key", tmpdir, session=FakeSession(api_videos, thumbnails))
+            self.assertEqual(stats, make_stats(missing=1))
+            self.assertEqual(os.listdir(tmpdir), [])
+
+    def test_refresh_metadata_renames_changed_titles(self):
+        """Test that a changed title renames the video and its sidecar files together"""
+        api_videos = {
+            "id0": make_video("id0", "New title", "Description 0"),
+            "id1": make_video("id1", "Other new title", "Description 1"),
+        }
+        thumbnails = {f"https://i.ytimg.com/vi/id{i}/hqdefault.jpg": b"jpeg" for i in range(2)}
+        videos = [
+            {"url": f"https://www.youtube.com/watch?v=id{i}", "upload_date": "2023-05-15T10:00:00Z"}
+            for i in range(2)
+        ]
+        date = datetime(2023, 5, 15)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # Two videos share the upload date, so the index has to tell them apart
+            for title in ("Old title", "Other old title"):
+                for ext in ("mp4", "txt", "jpg"):
+                    touch(os.path.join(tmpdir, format_filename(date, title, ext)))
+            with ArchiveIndex(tmpdir) as index:
+                index.record_download(format_filename(date, "Old title", "mp4"), videos[0]["url"])
+                index.record_download(format_filename(date, "Other old title", "mp4"), videos[1]["url"])
+
+            stats = refresh_metadata(videos, "key", tmpdir, session=FakeSession(api_videos, thumbnails))
+            self.assertEqual(stats, make_stats(descriptions=2, thumbnails=2, renamed=2))
+            self.assertEqual(
+                sorted(name for name in os.listdir(tmpdir) if not name.endswith(".sqlite3")),
+                sorted(format_filename(date, title, ext)
+                       for title in ("New title", "Other new title") for ext in ("mp4", "txt", "jpg"))
+            )
+            with ArchiveIndex(tmpdir) as index:
+                self.assertEqual(index.names_by_url()[videos[0]["url"]], format_filename(date, "New title", "mp4"))
+
+
+    def test_refresh_metadata_does_not_match_by_date(self):
+        """Test that a deleted video's file is not taken for a new upload from the same day"""
+        api_videos = {"new": make_video("new", "Brand new upload", "Description")}
+        thumbnails = {"https://i.ytimg.com/vi/new/hqdefault.jpg": b"jpeg"}
+        videos = [{"url": "https://www.youtube.com/watch?v=new", "upload_date": "2023-05-15T10:00:00Z"}]
+        deleted_name = format_filename(datetime(2023, 5, 15), "Deleted video", "mp4")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            touch(os.path.join(tmpdir, deleted_name))
+            stats = refresh_metadata(videos, "key", tmpdir, session=FakeSession(api_videos, thumbnails))
+            self.assertEqual(stats, make_stats(missing=1))
+            self.assertEqual(os.listdir(tmpdir), [deleted_name])
+
+
+if __name__ == '__main__':
+    unittest.main()
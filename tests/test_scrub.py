@@ -0,0 +1,120 @@
+"""
+Test cases for the integrity scrub
+"""
+
+import unittest
+import tempfile
+import struct
+import sys
+import os
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.archive_index import ArchiveIndex
+from src.scrub import mp4_duration, scrub, CORRUPT_SUFFIX
+from src.work_queue import SQLiteWorkQueue
+from tests.fakes import FakeSession
+
+
+def box(box_type, payload):
+    return struct.pack(">I4s", len(payload) + 8, box_type) + payload
+
+
+def make_mp4(duration_seconds, timescale=1000, media_size=4096):
+    """Build a minimal MP4 with a version 0 movie header"""
+    mvhd = box(b"mvhd", bytes(4) + struct.pack(">IIII", 0, 0, timescale, int(duration_seconds * timescale)) + bytes(80))
+    return box(b"ftyp", b"isom" + bytes(4)) + box(b"moov", mvhd) + box(b"mdat", bytes(media_size))
+
+
+class TestScrub(unittest.TestCase):
+    """Test cases for the scrub"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmpdir.name, 'Channel')
+        os.makedirs(self.folder)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_video(self, name, data, url=None, expected_duration=None):
+        with open(os.path.join(self.folder, name), 'wb') as f:
+            f.write(data)
+        if url:
+            with ArchiveIndex(self.folder) as index:
+                index.record_download(name, url, expected_duration)
+
+    def test_mp4_duration(self):
+        """Test that the duration is read from the movie header and truncation is detected"""
+        self.write_video('video.mp4', make_mp4(125.5))
+        self.assertAlmostEqual(mp4_duration(os.path.join(self.folder, 'video.mp4')), 125.5)
+
+        self.write_video('truncated.mp4', make_mp4(125.5)[:-100])
+        with self.assertRaises(ValueError):
+            mp4_duration(os.path.join(self.folder, 'truncated.mp4'))
+
+    def test_scrub_sets_aside_bad_videos(self):
+        """Test that truncated and short videos are renamed, indexed and requeued"""
+        queue = SQLiteWorkQueue(os.path.join(self.tmpdir.name, 'queue.sqlite3'))
+        urls = [f'https://www.youtube.com/watch?v=video{i}' for i in range(3)]
+        queue.enqueue([{'url': url} for url in urls])
+        for url in urls:
+            queue.claim('a', 60)
+            queue.complete(url, 'a')
+
+        self.write_video('good.mp4', make_mp4(60), urls[0], 60)
+        self.write_video('truncated.mp4', make_mp4(60)[:-10], urls[1], 60)
+        self.write_video('short.mp4', make_mp4(30), urls[2], 60)
+
+        stats = scrub(self.tmpdir.name, max_workers=2, work_queue=queue)
+        self.assertEqual(stats, {'ok': 1, 'corrupt': 1, 'short': 1, 'skipped': 0})
+        self.assertTrue(os.path.exists(os.path.join(self.folder, 'truncated.mp4' + CORRUPT_SUFFIX)))
+        self.assertFalse(os.path.exists(os.path.join(self.folder, 'short.mp4')))
+        self.assertEqual(queue.counts(), {'done': 1, 'pending': 2})
+
+        with ArchiveIndex(self.folder) as index:
+            entry = index.get('good.mp4')
+        self.assertEqual(entry['status'], 'ok')
+        self.assertEqual(len(entry['checksum']), 64)
+        self.assertEqual(entry['url'], urls[0])
+
+    def test_scrub_skips_unchanged_videos(self):
+        """Test that a later scrub only checks files changed since the last one"""
+        self.write_video('first.mp4', make_mp4(60))
+        self.write_video('second.mp4', make_mp4(60))
+        self.assertEqual(scrub(self.tmpdir.name)['ok'], 2)
+
+        self.write_video('second.mp4', make_mp4(61, media_size=8192))
+        self.assertEqual(scrub(self.tmpdir.name), {'ok': 1, 'corrupt': 0, 'short': 0, 'skipped': 1})
+        self.assertEqual(scrub(self.tmpdir.name, full=True)['ok'], 2)
+
+    def test_scrub_detects_changed_content(self):
+        """Test that a file rewritten with the same size and mtime is reported corrupt"""
+        self.write_video('video.mp4', make_mp4(60))
+        file_path = os.path.join(self.folder, 'video.mp4')
+        stat = os.stat(file_path)
+        self.assertEqual(scrub(self.tmpdir.name)['ok'], 1)
+
+        data = bytearray(make_mp4(60))
+        data[-1] = 1  # Flip a byte of the media data
+        self.write_video('video.mp4', bytes(data))
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(scrub(self.tmpdir.name)['skipped'], 1)
+        self.assertEqual(scrub(self.tmpdir.name, full=True), {'ok': 0, 'corrupt': 1, 'short': 0, 'skipped': 0})
+        self.assertTrue(os.path.exists(file_path + CORRUPT_SUFFIX))
+
+    def test_scrub_backfills_durations(self):
+        """Test that missing durations are looked up and short videos found even if unchanged"""
+        url = 'https://www.youtube.com/watch?v=video0'
+        self.write_video('video.mp4', make_mp4(30), url)
+        self.assertEqual(scrub(self.tmpdir.name)['ok'], 1)
+
+        session = FakeSession({'video0': {'id': 'video0', 'contentDetails': {'duration': 'PT1M'}}})
+        stats = scrub(self.tmpdir.name, api_key='key', session=session)
+        self.assertEqual(stats, {'ok': 0, 'corrupt': 0, 'short': 1, 'skipped': 0})
+        self.assertEqual(session.requested_ids, ['video0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Test cases for the sidecar store
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sidecar_store import SidecarStore, STORE_FILENAME
+from src.cli import main as cli_main
+
+
+class TestSidecarStore(unittest.TestCase):
+    """Test cases for SidecarStore"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmpdir.name, 'Channel')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_file(self, name, data):
+        os.makedirs(self.folder, exist_ok=True)
+        with open(os.path.join(self.folder, name), 'wb') as f:
+            f.write(data)
+
+    def test_put_skips_unchanged_content(self):
+        """Test that put reports whether the content changed"""
+        store = SidecarStore.for_folder(self.folder)
+        self.assertIs(store, SidecarStore.for_folder(self.folder))
+        try:
+            self.assertTrue(store.put('15-05-2023 - Video.txt', b'description'))
+            self.assertFalse(store.put('15-05-2023 - Video.txt', b'description'))
+            self.assertTrue(store.put('15-05-2023 - Video.txt', b'new description'))
+            self.assertEqual(store.get('15-05-2023 - Video.txt'), b'new description')
+            self.assertIsNone(store.get('missing.txt'))
+        finally:
+            store.close()
+
+    def test_pack_and_export_round_trip(self):
+        """Test that packing removes loose sidecars and exporting recreates them"""
+        self.write_file('15-05-2023 - Video.txt', b'description')
+        self.write_file('15-05-2023 - Video.jpg', b'\xff\xd8jpeg')
+        self.write_file('15-05-2023 - Video.mp4', b'video')
+        self.write_file('notes.txt', b'not a sidecar')
+
+        self.assertEqual(cli_main(['pack-sidecars', self.tmpdir.name]), 0)
+        self.assertEqual(
+            sorted(os.listdir(self.folder)),
+            sorted(['15-05-2023 - Video.mp4', STORE_FILENAME, 'notes.txt'])
+        )
+
+        self.assertEqual(cli_main(['export-sidecars', self.tmpdir.name]), 0)
+        with open(os.path.join(self.folder, '15-05-2023 - Video.jpg'), 'rb') as f:
+            self.assertEqual(f.read(), b'\xff\xd8jpeg')
+
+        destination = os.path.join(self.tmpdir.name, 'export')
+        self.assertEqual(cli_main(['export-sidecars', self.tmpdir.name, '--destination', destination]), 0)
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(destination, 'Channel'))),
+            ['15-05-2023 - Video.jpg', '15-05-2023 - Video.txt']
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
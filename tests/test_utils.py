@@ -3,6 +3,7 @@ Test cases for utility functions
 """
 
 import unittest
+import tempfile
 from datetime import datetime
 import sys
 import os
@@ -10,7 +11,7 @@ import os
 # Add the parent directory to the path to allow imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from src.utils import sanitize_filename, format_filename
+from src.utils import sanitize_filename, format_filename, write_if_changed
 
 
 class TestUtils(unittest.TestCase):
@@ -45,6 +46,17 @@ class TestUtils(unittest.TestCase):
             '15-05-2023 - Test_ Video_ With_ Symbols_.mp4'
         )
 
+    def test_write_if_changed(self):
+        """Test that write_if_changed only rewrites files whose content differs"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = os.path.join(tmpdir, 'description.txt')
+            self.assertTrue(write_if_changed(file_path, b'first'))
+            self.assertFalse(write_if_changed(file_path, b'first'))
+            self.assertTrue(write_if_changed(file_path, b'second'))
+            with open(file_path, 'rb') as f:
+                self.assertEqual(f.read(), b'second')
+            self.assertEqual(os.listdir(tmpdir), ['description.txt'])
+
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Test cases for the shared work queue
+"""
+
+import unittest
+import tempfile
+import sqlite3
+import time
+import sys
+import os
+
+# Add the parent directory to the path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.work_queue import WorkQueue, SQLiteWorkQueue, LeaseHeartbeat
+
+
+def make_jobs(count, channel_name='Channel'):
+    return [
+        {'url': f'https://www.youtube.com/watch?v=video{i}', 'channel_name': channel_name,
+         'title': f'Video {i}', 'upload_date': '2023-05-15T00:00:00Z'}
+        for i in range(count)
+    ]
+
+
+class TestSQLiteWorkQueue(unittest.TestCase):
+    """Test cases for SQLiteWorkQueue"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'queue.sqlite3')
+        # Two handles on the same file stand in for two hosts
+        self.host_a = SQLiteWorkQueue(self.path)
+        self.host_b = SQLiteWorkQueue(self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_enqueue_ignores_duplicates(self):
+        """Test that enqueueing the same channel from two hosts adds each job once"""
+        self.assertEqual(self.host_a.enqueue(make_jobs(3)), 3)
+        self.assertEqual(self.host_b.enqueue(make_jobs(3)), 0)
+        self.assertEqual(self.host_a.counts(), {'pending': 3})
+
+    def test_hosts_claim_different_jobs(self):
+        """Test that a leased job is not handed to another worker"""
+        self.host_a.enqueue(make_jobs(2))
+        job_a = self.host_a.claim('a', 60)
+        job_b = self.host_b.claim('b', 60)
+        self.assertNotEqual(job_a['url'], job_b['url'])
+        self.assertIsNone(self.host_a.claim('a', 60))
+
+    def test_expired_lease_is_reassigned(self):
+        """Test that a job whose lease expired can be claimed by another worker"""
+        self.host_a.enqueue(make_jobs(1))
+        job = self.host_a.claim('a', 0.05)
+        time.sleep(0.1)
+        reclaimed = self.host_b.claim('b', 60)
+        self.assertEqual(reclaimed['url'], job['url'])
+        self.assertEqual(reclaimed['attempts'], 2)
+        # The original holder has lost the lease
+        self.assertFalse(self.host_a.heartbeat(job['url'], 'a', 60))
+        self.assertFalse(self.host_a.complete(job['url'], 'a'))
+        self.assertTrue(self.host_b.complete(job['url'], 'b'))
+        self.assertEqual(self.host_a.counts(), {'done': 1})
+
+    def test_heartbeat_keeps_lease(self):
+        """Test that heartbeats stop a lease from expiring"""
+        self.host_a.enqueue(make_jobs(1))
+        job = self.host_a.claim('a', 0.2)
+        with LeaseHeartbeat(self.host_a, job['url'], 'a', 0.2, interval=0.05) as heartbeat:
+            time.sleep(0.4)
+            self.assertIsNone(self.host_b.claim('b', 60))
+        self.assertFalse(heartbeat.lost)
+
+    def test_fail_retries_then_gives_up(self):
+        """Test that failed jobs go back to pending until max_attempts is reached"""
+        queue = SQLiteWorkQueue(self.path, max_attempts=2)
+        queue.enqueue(make_jobs(1))
+        job = queue.claim('a', 60)
+        queue.fail(job['url'], 'a', 'network error')
+        self.assertEqual(queue.counts(), {'pending': 1})
+        job = queue.claim('a', 60)
+        queue.fail(job['url'], 'a', 'network error')
+        self.assertEqual(queue.counts(), {'failed': 1})
+        self.assertIsNone(queue.claim('a', 60))
+
+    def test_expired_lease_on_last_attempt_fails(self):
+        """Test that a job whose workers keep dying is given up instead of reclaimed forever"""
+        queue = SQLiteWorkQueue(self.path, max_attempts=2)
+        queue.enqueue(make_jobs(1))
+        queue.claim('a', 0.01)
+        time.sleep(0.05)
+        self.assertEqual(queue.claim('b', 0.01)['attempts'], 2)
+        time.sleep(0.05)
+        self.assertIsNone(queue.claim('c', 60))
+        self.assertEqual(queue.counts(), {'failed': 1})
+
+    def test_active_workers(self):
+        """Test that only workers with unexpired leases are active"""
+        self.host_a.enqueue(make_jobs(2))
+        self.host_a.claim('a', 60)
+        self.host_b.claim('b', 0.01)
+        time.sleep(0.05)
+        self.assertEqual(self.host_a.active_workers(), {'a'})
+
+    def test_heartbeat_failures_lose_lease(self):
+        """Test that a lease counts as lost once renewals fail for a whole lease"""
+        self.host_a.enqueue(make_jobs(1))
+        job = self.host_a.claim('a', 0.2)
+        os.remove(self.path)
+        os.mkdir(self.path)  # Every renewal now fails to open the database
+        with LeaseHeartbeat(self.host_a, job['url'], 'a', 0.2, interval=0.05) as heartbeat:
+            time.sleep(0.4)
+        self.assertTrue(heartbeat.lost)
+
+    def test_opens_wal_database(self):
+        """Test that a database left in WAL mode is switched back to rollback journaling"""
+        path = os.path.join(self.tmpdir.name, 'wal.sqlite3')
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+        SQLiteWorkQueue(path)
+        conn = sqlite3.connect(path)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'delete')
+        conn.close()
+
+    def test_incomplete_backend_cannot_be_created(self):
+        """Test that a backend missing methods fails when it is created"""
+        class PartialQueue(WorkQueue):
+            def enqueue(self, jobs):
+                return 0
+
+        with self.assertRaises(TypeError):
+            PartialQueue()
+
+    def test_claim_filters_by_channel(self):
+        """Test that claims can be limited to one channel"""
+        self.host_a.enqueue(make_jobs(1, 'First'))
+        self.host_a.enqueue([dict(job, url=job['url'] + 'x') for job in make_jobs(1, 'Second')])
+        job = self.host_a.claim('a', 60, channel_name='Second')
+        self.assertEqual(job['channel_name'], 'Second')
+        self.assertEqual(self.host_a.counts('First'), {'pending': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()